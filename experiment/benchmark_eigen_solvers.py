@@ -0,0 +1,149 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import numpy as np
+import sys
+import time
+
+sys.path.append(".")
+
+from sklearn.metrics import adjusted_rand_score
+
+from src.services.distance.connected_component import (
+    ExtractionLargestConnectedComponentProcessor,
+)
+from src.services.distance.isolated import RemovingIsolatedPointsProcessor
+from src.services.eigen.solvers import EIGEN_SOLVERS
+from src.services.eigen.solvers import build_eigen_solver
+from src.services.normalized_cut_service import normalized_cut
+from src.utils.distances_utils import sam_label_distance_sparse
+from src.utils.trace import Trace
+
+
+def build_synthetic_graph(seed, points_count, objects_count, views_count):
+    """Gaussian blobs of points seen by several views, each view assigns
+    the instance of the blob to 80% of its points and no instance to the rest.
+
+    The graph is built the same way as in the pipeline of main_kitti_processing.
+    """
+
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(0, 12, (objects_count, 3))
+    objects = rng.integers(0, objects_count, points_count)
+    points = centers[objects] + rng.normal(0, 1.0, (points_count, 3))
+
+    points2instances = np.stack(
+        [
+            np.where(rng.random(points_count) < 0.8, objects + 1, 0)
+            for _ in range(views_count)
+        ],
+        axis=1,
+    )
+
+    dist, _ = sam_label_distance_sparse(points2instances, points, 3, 5, 5)
+
+    trace = Trace(np.arange(points_count + 1), np.arange(points_count))
+    distance_processors = [
+        RemovingIsolatedPointsProcessor(),
+        ExtractionLargestConnectedComponentProcessor(),
+    ]
+    for processor in distance_processors:
+        dist, points, trace = processor.process(dist, points, trace)
+
+    return dist, objects[trace.indices]
+
+
+def clusters_to_labels(clusters, points_count):
+    labels = np.zeros(points_count, dtype=int)
+    for label, cluster in enumerate(clusters):
+        labels[cluster] = label
+
+    return labels
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Runtime and cluster agreement of the eigen solvers of normalized_cut. "
+        "ARI ref is the agreement with the clusters of the first solver that succeeded "
+        "on the graph (eigsh without warm start unless it failed), "
+        "ARI objects is the agreement with the objects the points were sampled from"
+    )
+    parser.add_argument("--points", type=int, nargs="+", default=[2000, 8000])
+    parser.add_argument("--objects", type=int, default=10)
+    parser.add_argument("--views", type=int, default=5)
+    parser.add_argument("--T", type=float, default=0.02)
+    parser.add_argument("--seeds", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        "{:>7} {:>4} {:>11} {:>5} {:>9} {:>9} {:>9} {:>11}".format(
+            "points",
+            "seed",
+            "solver",
+            "warm",
+            "time, s",
+            "clusters",
+            "ARI ref",
+            "ARI objects",
+        )
+    )
+    for points_count in args.points:
+        for seed in range(args.seeds):
+            w, objects = build_synthetic_graph(
+                seed, points_count, args.objects, args.views
+            )
+            labels = np.arange(w.shape[0])
+
+            reference = None
+            for name in EIGEN_SOLVERS:
+                for warm_start in [False, True]:
+                    start = time.perf_counter()
+                    try:
+                        clusters = normalized_cut(
+                            w,
+                            labels,
+                            args.T,
+                            eigen_solver=build_eigen_solver(name),
+                            warm_start=warm_start,
+                        )
+                    except (ImportError, ValueError, RuntimeError) as error:
+                        print(
+                            "{:>7} {:>4} {:>11} {:>5} failed: {}".format(
+                                w.shape[0], seed, name, str(warm_start), error
+                            )
+                        )
+                        continue
+                    elapsed = time.perf_counter() - start
+
+                    predicted = clusters_to_labels(clusters, w.shape[0])
+                    if reference is None:
+                        reference = predicted
+
+                    print(
+                        "{:>7} {:>4} {:>11} {:>5} {:>9.2f} {:>9} {:>9.3f} {:>11.3f}".format(
+                            w.shape[0],
+                            seed,
+                            name,
+                            str(warm_start),
+                            elapsed,
+                            len(clusters),
+                            adjusted_rand_score(reference, predicted),
+                            adjusted_rand_score(objects, predicted),
+                        )
+                    )
+
+
+if __name__ == "__main__":
+    main()
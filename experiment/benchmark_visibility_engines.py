@@ -0,0 +1,142 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import numpy as np
+import sys
+import tempfile
+import time
+
+sys.path.append(".")
+
+from src.datasets.kitti_dataset import KittiDataset
+from src.services.label_image_cache import LabelImageCache
+from src.services.preprocessing.common.config import ConfigDTO
+from src.services.preprocessing.init.instances_matrix import (
+    InitInstancesMatrixProcessor,
+)
+from src.services.preprocessing.init.map import InitMapProcessor
+from src.services.visibility.hidden_point_removal import (
+    HiddenPointRemovalVisibilityEngine,
+)
+from src.services.visibility.z_buffer import ZBufferVisibilityEngine
+
+
+def build_engines(args):
+    engines = [
+        ("hpr", HiddenPointRemovalVisibilityEngine()),
+        (
+            "hpr margin={}".format(args.frustum_margin),
+            HiddenPointRemovalVisibilityEngine(args.frustum_margin),
+        ),
+    ]
+    for scale in args.scales:
+        for splat_size in args.splat_sizes:
+            engines.append(
+                (
+                    "z_buffer scale={} splat={} tol={}".format(
+                        scale, splat_size, args.depth_tolerance
+                    ),
+                    ZBufferVisibilityEngine(scale, splat_size, args.depth_tolerance),
+                )
+            )
+
+    return engines
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Runtime of the visibility engines of the instance matrix of a window "
+        "and the agreement of the matrix with the one of the hidden point removal of open3d. "
+        "Precision is the fraction of the labelled entries that are labelled by hpr too, "
+        "recall is the fraction of the entries labelled by hpr that are labelled, "
+        "equal is the fraction of the entries labelled by both with the same label"
+    )
+    parser.add_argument("--dataset", default="tests/test_dataset/")
+    parser.add_argument("--sequence", default="00")
+    parser.add_argument(
+        "--image-instances", default="tests/test_pipeline/vfm-labels/sam/00/"
+    )
+    parser.add_argument("--start", type=int, default=3)
+    parser.add_argument("--end", type=int, default=7)
+    parser.add_argument("--offset", type=int, default=2)
+    parser.add_argument("--voxel-size", type=float, default=0.25)
+    parser.add_argument("--frustum-margin", type=float, default=50.0)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0, 0.5])
+    parser.add_argument("--splat-sizes", type=int, nargs="+", default=[0, 1])
+    parser.add_argument("--depth-tolerance", type=float, default=0.05)
+    args = parser.parse_args()
+
+    dataset = KittiDataset(args.dataset, args.sequence, args.image_instances)
+    config = ConfigDTO(
+        dataset=dataset,
+        start_index=args.start,
+        end_index=args.end,
+        start_image_index_offset=args.offset,
+        alpha_physical_distance=5,
+        beta_instance_distance=3,
+        T_normalized_cut=0.02,
+        reduce_detail_int_to_union_threshold=0.5,
+        reduce_detail_int_to_mask_threshold=0.6,
+    )
+    pcd = InitMapProcessor().process(config).voxel_down_sample(args.voxel_size)
+    print("points: {}".format(len(pcd.points)))
+
+    processor = InitInstancesMatrixProcessor()
+    # the label images are reduced once, so only the visibility differs in the runtime
+    label_image_cache = LabelImageCache(tempfile.mkdtemp())
+    matrix_args = (
+        pcd,
+        dataset,
+        config.cam_name,
+        config.start_index - config.start_image_index_offset,
+        config.end_index,
+        config.reduce_detail_int_to_union_threshold,
+        config.reduce_detail_int_to_mask_threshold,
+        1,
+        label_image_cache,
+    )
+    print(
+        "{:>40} {:>9} {:>9} {:>9} {:>9}".format(
+            "engine", "time, s", "precision", "recall", "equal"
+        )
+    )
+    reference = None
+    for name, engine in build_engines(args):
+        processor.build_points2instances_matrix(*matrix_args, visibility_engine=engine)
+        start = time.perf_counter()
+        points2instances = processor.build_points2instances_matrix(
+            *matrix_args, visibility_engine=engine
+        )
+        elapsed = time.perf_counter() - start
+
+        if reference is None:
+            reference = points2instances
+
+        labelled = points2instances != 0
+        labelled_reference = reference != 0
+        both = labelled & labelled_reference
+        print(
+            "{:>40} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}".format(
+                name,
+                elapsed,
+                both.sum() / max(labelled.sum(), 1),
+                both.sum() / max(labelled_reference.sum(), 1),
+                (points2instances[both] == reference[both]).sum() / max(both.sum(), 1),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
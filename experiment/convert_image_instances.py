@@ -0,0 +1,94 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import numpy as np
+import os
+import sys
+
+from pathlib import Path
+
+sys.path.append(".")
+
+from src.utils.sam_mask_utils import masks_to_compact
+
+
+def convert_file(src_path, dst_path, image_shape=None):
+    """Converting a file with pickled masks into the compact format,
+    files already in the compact format are copied unchanged.
+    The shape of the images without masks is image_shape, the other shapes are taken from the masks
+    """
+
+    with np.load(src_path, allow_pickle=True) as masks_file:
+        if "masks" in masks_file.files:
+            masks = list(masks_file["masks"])
+            compact = masks_to_compact(masks, image_shape if len(masks) == 0 else None)
+        else:
+            compact = {key: masks_file[key] for key in masks_file.files}
+
+    dst_path.parent.mkdir(parents=True, exist_ok=True)
+    # the file is renamed after it is fully written, so it can replace the source file
+    temp_path = dst_path.with_name(dst_path.name + ".tmp.npz")
+    np.savez_compressed(temp_path, **compact)
+    os.replace(temp_path, dst_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Converting the .npz files of SAM masks into the compact format without pickle"
+    )
+    parser.add_argument(
+        "src_dir",
+        help="directory with .npz files of masks, e.g. pipeline/vfm-labels/sam/00/",
+    )
+    parser.add_argument(
+        "dst_dir",
+        nargs="?",
+        default=None,
+        help="directory of the converted files",
+    )
+    parser.add_argument(
+        "--in-place",
+        action="store_true",
+        help="replace the source files by the converted ones if dst_dir is not given",
+    )
+    parser.add_argument(
+        "--image-shape",
+        nargs=2,
+        type=int,
+        default=None,
+        metavar=("HEIGHT", "WIDTH"),
+        help="shape of the images without masks, e.g. 376 1241 for KITTI",
+    )
+    args = parser.parse_args()
+
+    if args.dst_dir is None and not args.in_place:
+        parser.error("dst_dir or --in-place is required")
+
+    src_dir = Path(args.src_dir)
+    dst_dir = Path(args.dst_dir) if args.dst_dir is not None else src_dir
+
+    src_size = dst_size = 0
+    for src_path in sorted(src_dir.rglob("*.npz")):
+        dst_path = dst_dir.joinpath(src_path.relative_to(src_dir))
+        src_size += src_path.stat().st_size
+        convert_file(src_path, dst_path, args.image_shape)
+        dst_size += dst_path.stat().st_size
+        print("{} converted".format(src_path))
+
+    print("{} bytes -> {} bytes".format(src_size, dst_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import pickle
+import sys
+
+from pathlib import Path
+
+sys.path.append(".")
+
+from src.utils.result_utils import is_valid_result
+from src.utils.result_utils import save_result
+
+
+def convert_file(src_path, dst_path):
+    """Converting a pickled tuple of main_kitti_processing.py into a result directory"""
+
+    with open(src_path, "rb") as file:
+        data = pickle.load(file)
+
+    items = {key: value for item in data for key, value in item.items()}
+    traces = ["voxel_trace_original", "trace_graphcut", "clusters_graphcut"]
+
+    temp_path = dst_path.with_name(dst_path.name + ".tmp")
+    save_result(
+        temp_path,
+        arrays={
+            key: value
+            for key, value in items.items()
+            if key != "config" and key not in traces
+        },
+        traces={key: items[key] for key in traces},
+        attributes={"config": items["config"]},
+    )
+    temp_path.rename(dst_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Converting the pickled results of main_kitti_processing.py into result directories"
+    )
+    parser.add_argument(
+        "results_dir",
+        help="directory with start*_end*.pickle files, e.g. experiment_bin/",
+    )
+    args = parser.parse_args()
+
+    for src_path in sorted(Path(args.results_dir).glob("start*_end*.pickle")):
+        dst_path = src_path.with_suffix("")
+        if is_valid_result(dst_path):
+            continue
+        convert_file(src_path, dst_path)
+        print("{} converted".format(src_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,19 +14,25 @@
 
 import numpy as np
 import open3d as o3d
-import pickle
+import sys
 
 from sklearn.cluster import HDBSCAN
 
+sys.path.append(".")
+
+from src.utils.result_utils import load_result_array
+from src.utils.result_utils import load_result_trace
+from src.utils.result_utils import save_result
 
-def segment_pcds_by_hdbscan(start_index, end_index):
 
-    file_name = "experiment_bin/start{}_end{}.pickle".format(start_index, end_index)
+def segment_pcds_by_hdbscan(start_index, end_index):
 
-    with open(file_name, "rb") as file:
-        data = pickle.load(file)  # prepared dense cloud
+    # prepared dense cloud
+    result_path = "experiment_bin/start{}_end{}".format(start_index, end_index)
 
-    pcd_hdbscan_voxel_down_points = np.asarray(data[2]["voxel_pcd_original_points"])
+    pcd_hdbscan_voxel_down_points = np.asarray(
+        load_result_array(result_path, "voxel_pcd_original_points")
+    )
     pcd_hdbscan_voxel_down = o3d.geometry.PointCloud()
     pcd_hdbscan_voxel_down.points = o3d.utility.Vector3dVector(
         pcd_hdbscan_voxel_down_points
@@ -35,16 +41,22 @@ def segment_pcds_by_hdbscan(start_index, end_index):
     clusterer = HDBSCAN()
     clusters = clusterer.fit_predict(np.asarray(pcd_hdbscan_voxel_down.points))
 
-    return (
-        {
+    return {
+        "arrays": {
             "hdbscan_clustered_voxel_pcd_original_points": np.asarray(
                 pcd_hdbscan_voxel_down.points
-            )
+            ),
+            "hdbscan_clusters": clusters,
+            "inst_label_array_for_clustering": load_result_array(
+                result_path, "inst_label_array_for_clustering"
+            ),
         },
-        {"hdbscan_voxel_trace_original": data[3]["voxel_trace_original"]},
-        {"hdbscan_clusters": clusters},
-        {"inst_label_array_for_clustering": data[6]["inst_label_array_for_clustering"]},
-    )
+        "traces": {
+            "hdbscan_voxel_trace_original": load_result_trace(
+                result_path, "voxel_trace_original"
+            ),
+        },
+    }
 
 
 def process_kitti_hdbscan(from_num, to_num):
@@ -56,16 +68,12 @@ def process_kitti_hdbscan(from_num, to_num):
         start_index = current_from_num
         end_index = start_index + step
 
-        result_tuple = segment_pcds_by_hdbscan(start_index, end_index)
+        result = segment_pcds_by_hdbscan(start_index, end_index)
 
-        file_name = "experiment_bin_hdbscan/start{}_end{}.pickle".format(
+        result_path = "experiment_bin_hdbscan/start{}_end{}".format(
             start_index, end_index
         )  # hdbscan results
-        new_file = open(file_name, "w")
-        new_file.close()
-
-        with open(file_name, "wb") as file:
-            pickle.dump(result_tuple, file)
+        save_result(result_path, **result)
 
         print("start_index={}, end_index={} done".format(start_index, end_index))
         current_from_num = end_index
@@ -12,60 +12,51 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import csv
+import numpy as np
+import sys
 
+sys.path.append(".")
 
-def calculate_sum_ones_zeros(values):
-    sum, ones, zeros = 0, 0, 0
-    for value in values:
-        sum += float(value)
-        if float(value) == 1.0:
-            ones += 1
-        elif float(value) == 0.0:
-            zeros += 1
-    return sum, ones, zeros
+from src.services.evaluation import METRICS
+from src.services.evaluation import aggregate_metrics
+from src.services.evaluation import load_evaluation
 
 
-def calculate_metrics(file_name):
-    values_pres = []
-    values_recall = []
-    values_fScore = []
-    with open(file_name, "r") as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            values_pres.append(row["precision"])
-            values_recall.append(row["recall"])
-            values_fScore.append(row["fScore"])
+def load_csv(file_name):
+    """Columns of a csv file of the previous versions of the metrics scripts with a header row"""
 
-    sum_pres, pres1, pres0 = calculate_sum_ones_zeros(values_pres)
-    sum_recall, recall1, recall0 = calculate_sum_ones_zeros(values_recall)
-    sum_fScore, fscore1, fscore0 = calculate_sum_ones_zeros(values_fScore)
+    table = np.genfromtxt(file_name, delimiter=",", names=True)
+    return {name: np.atleast_1d(table[name]) for name in METRICS}
 
-    print(
-        "precision={}, 1={}, 0={}".format(
-            sum_pres / float(len(values_pres)),
-            pres1 / float(len(values_pres)),
-            pres0 / float(len(values_pres)),
-        )
-    )
-    print(
-        "recall={}, 1={}, 0={}".format(
-            sum_recall / float(len(values_recall)),
-            recall1 / float(len(values_recall)),
-            recall0 / float(len(values_recall)),
-        )
-    )
-    print(
-        "fscore={}, 1={}, 0={}".format(
-            sum_fScore / float(len(values_fScore)),
-            fscore1 / float(len(values_fScore)),
-            fscore0 / float(len(values_fScore)),
-        )
-    )
+
+def calculate_metrics(file_name, group_by=("sequence", "instance_threshold")):
+    if file_name.endswith(".csv"):
+        columns, group_by = load_csv(file_name), ()
+    else:
+        columns = load_evaluation(file_name)
+
+    aggregates = aggregate_metrics(columns, group_by)
+
+    for group in range(len(aggregates["windows"])):
+        if group_by:
+            print(
+                ", ".join(
+                    "{}={}".format(name, aggregates[name][group]) for name in group_by
+                )
+            )
+        for name, short_name in zip(METRICS, ["precision", "recall", "fscore"]):
+            print(
+                "{}={}, 1={}, 0={}".format(
+                    short_name,
+                    aggregates["{}_mean".format(name)][group],
+                    aggregates["{}_ones".format(name)][group],
+                    aggregates["{}_zeros".format(name)][group],
+                )
+            )
 
 
 def main():
-    calculate_metrics("experiment_50.csv")
+    calculate_metrics("experiment_metrics.npz")
 
 
 if __name__ == "__main__":
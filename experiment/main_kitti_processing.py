@@ -12,9 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import copy
+import functools
 import numpy as np
-import pickle
 import sys
 
 sys.path.append("/Users/sofiavivdich/proj/lidar-labelling")
@@ -23,11 +22,17 @@ from scipy.spatial.distance import cdist
 
 from src.datasets.kitti_dataset import KittiDataset
 
+from src.services.batch_runner import BatchRunner
+
 from src.services.distance.isolated import RemovingIsolatedPointsProcessor
 from src.services.distance.connected_component import (
+    ExtractionConnectedComponentsProcessor,
     ExtractionLargestConnectedComponentProcessor,
 )
+from src.services.eigen.solvers import build_eigen_solver
+from src.services.label_image_cache import LabelImageCache
 from src.services.normalized_cut_service import normalized_cut
+from src.services.scan_cache import ScanCache
 from src.services.preprocessing.common.config import ConfigDTO
 from src.services.preprocessing.init.map import InitMapProcessor
 from src.services.preprocessing.init.instances_matrix import (
@@ -39,17 +44,26 @@ from src.services.preprocessing.statistical_outlier import StatisticalOutlierPro
 from src.services.preprocessing.voxel_down import VoxelDownProcessor
 
 from src.utils.distances_utils import sam_label_distance
+from src.utils.distances_utils import sam_label_distance_sparse
 from src.utils.gt_utils import build_sem_inst_label_arrays
-
+from src.utils.result_utils import is_valid_result
+from src.utils.result_utils import save_result
 
 dataset_path = "dataset/"
 sequence = "00"
 image_instances_path = "pipeline/vfm-labelss/sam/00/"
 gt_labels_path = "dataset/sequences/00/labels/"
 kitti = KittiDataset(dataset_path, sequence, image_instances_path)
+label_image_cache = LabelImageCache("pipeline/label-images-cache/")
 
+# with stride < window_size consecutive windows overlap and share the loaded clouds,
+# every worker process keeps the clouds of its last window
+window_size = 4
+stride = 4
+scan_cache = ScanCache(capacity=window_size)
 
-def build_tuple_bin_saving(
+
+def build_result(
     config,
     pcd_for_clustering,
     voxel_pcd,
@@ -70,28 +84,22 @@ def build_tuple_bin_saving(
         config.reduce_detail_int_to_mask_threshold
     )
 
-    src_trace_arrays = []
-    for int_vector in voxel_src_trace:
-        src_trace_arrays.append(np.asarray(int_vector))
-
-    trace_arrays = []
-    for int_vector in trace:
-        trace_arrays.append(np.asarray(int_vector))
-
-    return (
-        {"config": params},
-        {
+    return {
+        "arrays": {
             "pcd_for_clustering_before_voxelization_points": np.asarray(
                 pcd_for_clustering.points
-            )
+            ),
+            "voxel_pcd_original_points": np.asarray(voxel_pcd.points),
+            "inst_label_array_for_clustering": inst_label_array_for_clustering,
+            "sem_label_array_for_clustering": sem_label_array_for_clustering,
         },
-        {"voxel_pcd_original_points": np.asarray(voxel_pcd.points)},
-        {"voxel_trace_original": src_trace_arrays},
-        {"trace_graphcut": trace_arrays},
-        {"clusters_graphcut": clusters},
-        {"inst_label_array_for_clustering": inst_label_array_for_clustering},
-        {"sem_label_array_for_clustering": sem_label_array_for_clustering},
-    )
+        "traces": {
+            "voxel_trace_original": voxel_src_trace,
+            "trace_graphcut": trace,
+            "clusters_graphcut": clusters,
+        },
+        "attributes": {"config": params},
+    }
 
 
 def segment_pcds(config):
@@ -108,7 +116,9 @@ def segment_pcds(config):
         StatisticalOutlierProcessor(),
     ]
 
-    pcd = copy.deepcopy(init_pcd)
+    # the processors do not change their input clouds and arrays, they return new ones,
+    # so the intermediate results are kept without copying
+    pcd = init_pcd
     for processor in processors:
         pcd, points2instances, indices = processor.process(
             config, pcd, points2instances
@@ -116,100 +126,163 @@ def segment_pcds(config):
         inst_label_array_src = inst_label_array_src[indices]
         sem_label_array_src = sem_label_array_src[indices]
 
-    pcd_for_clustering = copy.deepcopy(pcd)
-    points2instances_pcd_for_clustering = copy.deepcopy(points2instances)
-    inst_label_array_for_clustering = copy.deepcopy(inst_label_array_src)
-    sem_label_array_for_clustering = copy.deepcopy(sem_label_array_src)
+    pcd_for_clustering = pcd
+    inst_label_array_for_clustering = inst_label_array_src
+    sem_label_array_for_clustering = sem_label_array_src
 
     pcd, points2instances, trace = VoxelDownProcessor().process(
         config, pcd, points2instances
     )
-    voxel_pcd = copy.deepcopy(pcd)
-    voxel_src_trace = copy.deepcopy(trace)
+    voxel_pcd = pcd
+    voxel_src_trace = trace
 
     points = np.asarray(pcd.points)
-    spatial_distance = cdist(points, points)
-
-    dist, masks = sam_label_distance(
-        points2instances,
-        spatial_distance,
-        3,
-        config.beta_instance_distance,
-        config.alpha_physical_distance,
-    )
+
+    if config.sparse_distance_matrix:
+        dist, masks = sam_label_distance_sparse(
+            points2instances,
+            points,
+            3,
+            config.beta_instance_distance,
+            config.alpha_physical_distance,
+        )
+    else:
+        spatial_distance = cdist(points, points)
+
+        dist, masks = sam_label_distance(
+            points2instances,
+            spatial_distance,
+            3,
+            config.beta_instance_distance,
+            config.alpha_physical_distance,
+        )
+
+    if config.min_component_size is None:
+        components_processor = ExtractionLargestConnectedComponentProcessor()
+    else:
+        components_processor = ExtractionConnectedComponentsProcessor(
+            min_component_size=config.min_component_size
+        )
 
     distance_processors = [
         RemovingIsolatedPointsProcessor(),
-        ExtractionLargestConnectedComponentProcessor(),
+        components_processor,
     ]
 
     for processor in distance_processors:
         dist, points, trace = processor.process(dist, points, trace)
 
+    # the components are segmented independently, the largest one first
+    components = ExtractionConnectedComponentsProcessor().find_components(dist)
+
     eigenval = 2
     clusters = normalized_cut(
         dist,
         np.array([i for i in range(len(points))], dtype=int),
         config.T_normalized_cut,
         eigenval,
+        num_workers=config.num_workers,
+        pool="process",
+        eigen_solver=build_eigen_solver(config.eigen_solver),
+        warm_start=config.eigen_warm_start,
+        components=components,
     )
 
-    return build_tuple_bin_saving(
+    return build_result(
         config,
-        copy.deepcopy(pcd_for_clustering),
-        copy.deepcopy(voxel_pcd),
-        copy.deepcopy(voxel_src_trace),
-        copy.deepcopy(trace),
-        copy.deepcopy(clusters),
-        copy.deepcopy(inst_label_array_for_clustering),
-        copy.deepcopy(sem_label_array_for_clustering),
+        pcd_for_clustering,
+        voxel_pcd,
+        voxel_src_trace,
+        trace,
+        clusters,
+        inst_label_array_for_clustering,
+        sem_label_array_for_clustering,
     )
 
 
+def segment_window(
+    window, alpha_physical_distance, beta_instance_distance, T_normalized_cut
+):
+    start_index, end_index = window
+    config = ConfigDTO(
+        **{
+            "dataset": kitti,
+            "start_index": start_index,
+            "end_index": end_index,
+            "start_image_index_offset": 0,
+            "alpha_physical_distance": alpha_physical_distance,
+            "beta_instance_distance": beta_instance_distance,
+            "T_normalized_cut": T_normalized_cut,
+            "reduce_detail_int_to_union_threshold": 0.5,
+            "reduce_detail_int_to_mask_threshold": 0.6,
+            "cam_name": "cam2",
+            "R": 18,
+            "nb_neighbors": 25,
+            "std_ratio": 5.0,
+            "voxel_size": 0.25,
+            "sparse_distance_matrix": False,
+            "eigen_solver": "eigsh",
+            "eigen_warm_start": False,
+            "min_component_size": None,
+            "num_workers": 1,
+            "visibility_engine": "hpr",
+            "frustum_margin": 50.0,
+            "label_image_cache": label_image_cache,
+            "scan_cache": scan_cache,
+        }
+    )
+
+    result = segment_pcds(config)
+
+    print("start_index={}, end_index={} done".format(start_index, end_index))
+    return result
+
+
+def get_output_path(window):
+    return "experiment_bin/start{}_end{}".format(*window)
+
+
+def save_window_result(result, path):
+    save_result(path, **result)
+
+
 def process_kitti(
     from_num,
     to_num,
     alpha_physical_distance,
     beta_instance_distance,
     T_normalized_cut,
+    num_workers=1,
 ):
-    current_from_num = from_num
-
-    while current_from_num < to_num:
-        start_index = current_from_num
-        end_index = start_index + 4
-        config = ConfigDTO(
-            **{
-                "dataset": kitti,
-                "start_index": start_index,
-                "end_index": end_index,
-                "start_image_index_offset": 0,
-                "alpha_physical_distance": alpha_physical_distance,
-                "beta_instance_distance": beta_instance_distance,
-                "T_normalized_cut": T_normalized_cut,
-                "reduce_detail_int_to_union_threshold": 0.5,
-                "reduce_detail_int_to_mask_threshold": 0.6,
-                "cam_name": "cam2",
-                "R": 18,
-                "nb_neighbors": 25,
-                "std_ratio": 5.0,
-                "voxel_size": 0.25,
-            }
-        )
+    """Segmentation of the windows of the sequence from from_num to to_num
 
-        result_tuple = segment_pcds(config)
+    The windows whose results are already saved are skipped, so an interrupted run
+    is resumed by running it again. The status of the windows is in experiment_bin/manifest.json
+    """
 
-        file_name = "experiment_bin/start{}_end{}.pickle".format(
-            config.start_index, config.end_index
-        )
-        new_file = open(file_name, "w")
-        new_file.close()
+    windows = [
+        (start_index, start_index + window_size)
+        for start_index in range(from_num, to_num, stride)
+    ]
 
-        with open(file_name, "wb") as file:
-            pickle.dump(result_tuple, file)
+    runner = BatchRunner(
+        functools.partial(
+            segment_window,
+            alpha_physical_distance=alpha_physical_distance,
+            beta_instance_distance=beta_instance_distance,
+            T_normalized_cut=T_normalized_cut,
+        ),
+        save_window_result,
+        is_valid_result,
+        get_output_path,
+        "experiment_bin/manifest.json",
+        num_workers,
+    )
+    manifest = runner.run(windows)
 
-        print("start_index={}, end_index={} done".format(start_index, end_index))
-        current_from_num = end_index
+    for record in manifest["windows"].values():
+        if record["status"] == "failed":
+            print("{} failed: {}".format(record["output"], record["error"]))
 
 
 def main():
@@ -226,6 +299,7 @@ def main():
         alpha_physical_distance,
         beta_instance_distance,
         T_normalized_cut,
+        num_workers=1,
     )
 
 
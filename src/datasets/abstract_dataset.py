@@ -44,6 +44,12 @@ class AbstractDataset(ABC):
     def get_image_instances(self, cam_name, index):
         pass
 
+    def get_image_instances_id(self, cam_name, index):
+        """Identifier of the instances of the image that changes when they change,
+        it is used as a key of the cache of label images. None means the instances can not be cached
+        """
+        return None
+
     @abstractmethod
     def get_camera_intrinsics(self, cam_name):
         pass
@@ -20,6 +20,7 @@ import pykitti
 from pathlib import Path
 
 from src.datasets.abstract_dataset import AbstractDataset
+from src.utils.sam_mask_utils import compact_to_masks
 
 
 class KittiDataset(AbstractDataset):
@@ -27,8 +28,24 @@ class KittiDataset(AbstractDataset):
 
     def __init__(self, dataset_path, sequence, image_instances_path):
         super().__init__(pykitti.odometry(dataset_path, sequence))
+        self.dataset_path = dataset_path
+        self.sequence = sequence
         self.image_instances_path = image_instances_path
 
+    def __getstate__(self):
+        # pykitti calibration is an instance of a dynamically created class that can not be pickled,
+        # so the dataset is pickled by its paths (e.g. for worker processes) and loaded again
+        return {
+            "dataset_path": self.dataset_path,
+            "sequence": self.sequence,
+            "image_instances_path": self.image_instances_path,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(
+            state["dataset_path"], state["sequence"], state["image_instances_path"]
+        )
+
     def get_point_cloud(self, index):
         points = self.dataset.get_velo(index)[:, :3]
         pcd = o3d.geometry.PointCloud()
@@ -58,10 +75,28 @@ class KittiDataset(AbstractDataset):
         return cv2.cvtColor(np.array(image), color)
 
     def get_image_instances(self, cam_name, index):
-        masks_path = Path.cwd().joinpath(
+        """The masks of the segmented image, they are stored either as a pickled list
+        of mask dictionaries ("masks") or in the compact format of masks_to_compact
+        """
+
+        masks_path = self.get_image_instances_path(cam_name, index)
+        with np.load(masks_path, allow_pickle=False) as masks_file:
+            if "masks" not in masks_file.files:
+                return compact_to_masks(masks_file)
+
+        # only the legacy files of pickled masks are loaded with pickle
+        with np.load(masks_path, allow_pickle=True) as masks_file:
+            return masks_file["masks"]
+
+    def get_image_instances_id(self, cam_name, index):
+        masks_path = self.get_image_instances_path(cam_name, index)
+        stat = masks_path.stat()
+        return "{}:{}:{}".format(masks_path.resolve(), stat.st_size, stat.st_mtime_ns)
+
+    def get_image_instances_path(self, cam_name, index):
+        return Path.cwd().joinpath(
             self.image_instances_path, cam_name, "{}.npz".format(str(index).zfill(6))
         )
-        return np.load(masks_path, allow_pickle=True)["masks"]
 
     def get_camera_intrinsics(self, cam_name):
         if cam_name == "cam0":
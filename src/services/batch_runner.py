@@ -0,0 +1,182 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+from pathlib import Path
+
+
+class BatchRunner:
+    """Processing of a sequence of windows by a pool of processes that can be resumed after a failure
+
+    Each window is a separate task of the pool, its record is written to the manifest as soon as
+    the window is finished, so a crash of the run or of a worker loses no finished windows.
+    The windows are submitted in order, a worker process keeps its caches (e.g. ScanCache) between
+    its windows. A window whose output already exists and is valid is skipped. The output of a window
+    is written to a temporary path and renamed, so an interrupted run never leaves a partial output,
+    the temporary paths left by killed workers are removed when the run is resumed.
+    The status and the processing time of every window are recorded in a JSON manifest.
+
+    Parameters
+    ----------
+    process_window : callable
+        process_window(window) returns the result of the window
+    save_result : callable
+        save_result(result, path) writes the result of a window to the path
+    is_valid_output : callable
+        is_valid_output(path) checks that the path is a complete output of a window
+    get_output_path : callable
+        get_output_path(window) is the path of the output of the window
+    manifest_path : str or Path
+        path of the JSON manifest, the records of the previous runs are kept in it
+    num_workers : int
+        number of worker processes, the windows are processed in the current process if it is 1
+    """
+
+    def __init__(
+        self,
+        process_window,
+        save_result,
+        is_valid_output,
+        get_output_path,
+        manifest_path,
+        num_workers=1,
+    ):
+        self.process_window = process_window
+        self.save_result = save_result
+        self.is_valid_output = is_valid_output
+        self.get_output_path = get_output_path
+        self.manifest_path = Path(manifest_path)
+        self.num_workers = num_workers
+
+    def run(self, windows):
+        """Processing of the windows whose outputs are missing or invalid, returns the manifest"""
+
+        manifest = self.load_manifest()
+        records = manifest["windows"]
+
+        pending_windows = []
+        for window in windows:
+            path = str(self.get_output_path(window))
+            # temporary outputs of the workers killed in the previous runs
+            remove_temp_paths(Path(path))
+            if self.is_valid_output(path):
+                # the record of the run that produced the output is kept
+                if records.get(path, {}).get("status") != "done":
+                    records[path] = self.build_record(window, "skipped", None, None)
+            else:
+                pending_windows.append(window)
+
+        self.save_manifest(manifest)
+
+        if self.num_workers <= 1:
+            for window in pending_windows:
+                record = self.run_window(window)
+                records[record["output"]] = record
+                self.save_manifest(manifest)
+            return manifest
+
+        with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+            futures = {
+                executor.submit(run_window, self, window): window
+                for window in pending_windows
+            }
+            for future in as_completed(futures):
+                try:
+                    record = future.result()
+                except Exception as error:  # e.g. a worker process was killed
+                    record = self.build_record(
+                        futures[future], "failed", None, repr(error)
+                    )
+                records[record["output"]] = record
+                self.save_manifest(manifest)
+
+        return manifest
+
+    def run_window(self, window):
+        """Processing of one window, the exceptions are recorded instead of being raised"""
+
+        path = Path(self.get_output_path(window))
+        temp_path = path.with_name(get_temp_name(path, os.getpid()))
+
+        start = time.perf_counter()
+        try:
+            result = self.process_window(window)
+            self.save_result(result, str(temp_path))
+            if path.is_dir():
+                shutil.rmtree(path)
+            os.replace(temp_path, path)
+        except Exception as error:
+            remove_path(temp_path)
+            return self.build_record(
+                window, "failed", time.perf_counter() - start, repr(error)
+            )
+
+        return self.build_record(window, "done", time.perf_counter() - start, None)
+
+    def build_record(self, window, status, seconds, error):
+        return {
+            "window": list(window),
+            "output": str(self.get_output_path(window)),
+            "status": status,
+            "seconds": seconds,
+            "error": error,
+            "pid": os.getpid(),
+        }
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path) as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"windows": {}}
+
+    def save_manifest(self, manifest):
+        manifest["updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        file, temp_path = tempfile.mkstemp(dir=self.manifest_path.parent, suffix=".tmp")
+        with os.fdopen(file, "w") as temp_file:
+            json.dump(manifest, temp_file, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+
+def run_window(runner, window):
+    return runner.run_window(window)
+
+
+def get_temp_name(path, pid):
+    return "{}.tmp{}".format(path.name, pid)
+
+
+def remove_temp_paths(path):
+    """Removing the temporary outputs of the path written by any process"""
+
+    prefix = get_temp_name(path, "")
+    for temp_path in path.parent.glob(prefix + "*"):
+        if temp_path.name[len(prefix) :].isdigit():
+            remove_path(temp_path)
+
+
+def remove_path(path):
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
@@ -12,44 +12,75 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import copy
 import numpy as np
 import zope.interface
 
+from scipy import sparse
+
 from src.services.distance.interface import IProcessor
-from src.utils.distances_utils import dfs
 from src.utils.pcd_utils import color_pcd_by_two_groups
 from src.utils.pcd_utils import visualize_pcd
 
 
 @zope.interface.implementer(IProcessor)
-class ExtractionLargestConnectedComponentProcessor:
-    def process(self, distance_matrix, points, trace):
-        """Extraction the largest connected component of a graph using the dfs algorithm"""
+class ExtractionConnectedComponentsProcessor:
+    """Extraction of the connected components of a graph
+
+    The components are ordered by decreasing size, components of equal size
+    are ordered by the smallest vertex in them.
+
+    Parameters
+    ----------
+    components_count : int
+        number of the largest components that are kept, all components are kept if None
+    min_component_size : int
+        components with fewer vertices are removed
+    """
 
-        num_vertices = len(points)
-        half_num_vertices = num_vertices // 2
-        visited_vertices = np.array([False for i in range(num_vertices)], dtype=bool)
-        for i in range(num_vertices):
-            visited_vertices = dfs(distance_matrix, i)
-            if visited_vertices.sum() >= half_num_vertices:
-                break
+    def __init__(self, components_count=None, min_component_size=1):
+        self.components_count = components_count
+        self.min_component_size = min_component_size
 
-        not_visited_vertices = [
-            vertex
-            for vertex, is_visited in enumerate(visited_vertices)
-            if not is_visited
-        ]
+    def process(self, distance_matrix, points, trace):
+        """Extraction the selected connected components of a graph
+        using scipy.sparse.csgraph.connected_components"""
+
+        selected_vertices = self.find_components(distance_matrix) >= 0
 
-        # Visualization of the extracted connectivity component against the background of the entire cloud
-        # visualize_pcd(color_pcd_by_two_groups(points, not_visited_vertices))
+        # Visualization of the extracted connectivity components against the background of the entire cloud
+        # visualize_pcd(color_pcd_by_two_groups(points, np.flatnonzero(~selected_vertices)))
 
-        trace_copy = copy.deepcopy(trace)
-        for index in sorted(not_visited_vertices, reverse=True):
-            del trace_copy[index]
+        if sparse.issparse(distance_matrix):
+            distance_matrix = sparse.csr_matrix(distance_matrix)
 
         return (
-            distance_matrix[visited_vertices][:, visited_vertices],
-            points[visited_vertices],
-            trace_copy,
+            distance_matrix[selected_vertices][:, selected_vertices],
+            points[selected_vertices],
+            trace.subset(selected_vertices),
         )
+
+    def find_components(self, distance_matrix):
+        """Number of the selected component of each vertex in the order of components, -1 for other vertices"""
+
+        components_count, labels = sparse.csgraph.connected_components(
+            sparse.csr_matrix(distance_matrix), directed=False
+        )
+
+        sizes = np.bincount(labels, minlength=components_count)
+        order = np.lexsort((np.arange(components_count), -sizes))
+        order = order[sizes[order] >= self.min_component_size]
+        if self.components_count is not None:
+            order = order[: self.components_count]
+
+        selected_components = np.full(components_count, -1)
+        selected_components[order] = np.arange(len(order))
+
+        return selected_components[labels]
+
+
+@zope.interface.implementer(IProcessor)
+class ExtractionLargestConnectedComponentProcessor(
+    ExtractionConnectedComponentsProcessor
+):
+    def __init__(self):
+        super().__init__(components_count=1)
@@ -22,4 +22,5 @@ class IProcessor(zope.interface.Interface):
 
         The result of processing is a distance matrix, a set of points
         and a trace that contains only those points that satisfy the desired property.
+        The trace is an instance of src.utils.trace.Trace.
         """
@@ -12,10 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import copy
 import numpy as np
 import zope.interface
 
+from scipy import sparse
+
 from src.services.distance.interface import IProcessor
 
 
@@ -24,23 +25,33 @@ class RemovingIsolatedPointsProcessor:
     def process(self, distance_matrix, points, trace):
         """Removing isolated points that have all 0s in the distance matrix except the diagonal element"""
 
+        if sparse.issparse(distance_matrix):
+            return self.process_sparse(distance_matrix, points, trace)
+
         mask_isolated = np.all(
             distance_matrix - np.eye(distance_matrix.shape[0]) == 0, axis=1
         )
-        isolated_points = np.array([i for i in range(len(points))], dtype=int)[
-            mask_isolated
-        ]
+        mask_not_isolated = ~mask_isolated
+
+        return (
+            distance_matrix[mask_not_isolated][:, mask_not_isolated],
+            points[mask_not_isolated],
+            trace.subset(mask_not_isolated),
+        )
+
+    def process_sparse(self, distance_matrix, points, trace):
+        """Removing isolated points for a sparse distance matrix"""
 
-        trace_copy = copy.deepcopy(trace)
-        for index in sorted(isolated_points, reverse=True):
-            del trace_copy[index]
+        distance_matrix = sparse.csr_matrix(distance_matrix)
 
-        mask_not_isolated = np.any(
-            distance_matrix - np.eye(distance_matrix.shape[0]) != 0, axis=1
+        not_diagonal = distance_matrix - sparse.identity(
+            distance_matrix.shape[0], format="csr"
         )
+        not_diagonal.eliminate_zeros()
+        mask_not_isolated = not_diagonal.getnnz(axis=1) > 0
 
         return (
             distance_matrix[mask_not_isolated][:, mask_not_isolated],
             points[mask_not_isolated],
-            trace_copy,
+            trace.subset(mask_not_isolated),
         )
@@ -0,0 +1,27 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import zope.interface
+
+
+class IEigenSolver(zope.interface.Interface):
+    def solve(A, eigenvalues_count, v0):
+        """Calculating the eigenvalues_count smallest eigenvalues of the symmetric matrix A
+        and the corresponding eigenvectors.
+
+        v0 is an approximation of the eigenvector of the second smallest eigenvalue
+        (e.g. the eigenvector of the parent partition restricted to the current one) or None.
+
+        The result is an array of eigenvalues and a matrix whose columns are the eigenvectors.
+        """
@@ -0,0 +1,99 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import zope.interface
+
+from scipy import sparse
+
+from src.services.eigen.interface import IEigenSolver
+
+
+@zope.interface.implementer(IEigenSolver)
+class LobpcgEigenSolver:
+    """Locally optimal block preconditioned conjugate gradient method,
+    it needs only products of A by vectors and no factorization of A
+
+    Parameters
+    ----------
+    tol : float
+        residual tolerance of the eigenvectors of A scaled to the spectrum in [0, 1].
+        The smallest eigenvalues of the graphs are very close to each other,
+        so the tolerance is much tighter than the scipy default
+    maxiter : int
+        maximum number of iterations
+    seed : int
+        seed of the random initial vectors
+    """
+
+    def __init__(self, tol=1e-8, maxiter=200, seed=0):
+        self.tol = tol
+        self.maxiter = maxiter
+        self.seed = seed
+
+    def solve(self, A, eigenvalues_count, v0):
+        if A.shape[0] < 5 * eigenvalues_count:
+            # lobpcg is not intended for so small matrices
+            A = A.toarray() if sparse.issparse(A) else np.asarray(A)
+            eigvals, eigvecs = np.linalg.eigh(A)
+            return eigvals[:eigenvalues_count], eigvecs[:, :eigenvalues_count]
+
+        # The eigenvalues of A are scaled into [0, 1] by the Gershgorin bound,
+        # so that the tolerance does not depend on the degrees of the vertices
+        scale = np.max(np.asarray(abs(A).sum(axis=1)))
+        A = A / scale
+
+        # The block is larger than the number of eigenvalues, otherwise with
+        # a bad initial approximation lobpcg may converge to the wrong eigenvectors
+        block_size = min(2 * eigenvalues_count, A.shape[0] // 5)
+        X = np.random.default_rng(self.seed).uniform(
+            -1.0, 1.0, (A.shape[0], block_size)
+        )
+        if v0 is not None:
+            X[:, 1 % block_size] = v0
+
+        eigvals, eigvecs = sparse.linalg.lobpcg(
+            A,
+            X,
+            M=self.build_preconditioner(A),
+            tol=self.tol,
+            maxiter=self.maxiter,
+            largest=False,
+        )
+
+        order = np.argsort(eigvals)[:eigenvalues_count]
+
+        return eigvals[order] * scale, eigvecs[:, order]
+
+    def build_preconditioner(self, A):
+        return None
+
+
+@zope.interface.implementer(IEigenSolver)
+class AmgLobpcgEigenSolver(LobpcgEigenSolver):
+    """LOBPCG preconditioned by a smoothed aggregation algebraic multigrid V-cycle,
+    requires the pyamg package
+    """
+
+    def build_preconditioner(self, A):
+        try:
+            import pyamg
+        except ImportError:
+            raise ImportError(
+                "pyamg is required for the AMG preconditioned LOBPCG eigen solver"
+            )
+
+        return pyamg.smoothed_aggregation_solver(
+            sparse.csr_matrix(A)
+        ).aspreconditioner()
@@ -0,0 +1,45 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import zope.interface
+
+from scipy import sparse
+
+from src.services.eigen.interface import IEigenSolver
+
+
+@zope.interface.implementer(IEigenSolver)
+class ShiftInvertEigenSolver:
+    """Lanczos method applied to the inverse of A (shift-invert mode with sigma=0)
+
+    Parameters
+    ----------
+    fallback_shift : float
+        shift below zero, relative to the Gershgorin bound of the spectrum of A, used
+        when A itself cannot be factorized. A is positive semidefinite, so the eigenvalues
+        closest to the shift are still the smallest ones
+    """
+
+    def __init__(self, fallback_shift=1e-10):
+        self.fallback_shift = fallback_shift
+
+    def solve(self, A, eigenvalues_count, v0):
+        try:
+            return sparse.linalg.eigsh(A, eigenvalues_count, sigma=0, which="LM", v0=v0)
+        except (RuntimeError, ValueError):
+            # A is singular up to rounding, so its factorization can be exactly singular
+            # ("Factor is exactly singular") or give NaN. The retry starts from a random vector
+            sigma = -self.fallback_shift * np.max(np.asarray(abs(A).sum(axis=1)))
+            return sparse.linalg.eigsh(A, eigenvalues_count, sigma=sigma, which="LM")
@@ -0,0 +1,34 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from src.services.eigen.lobpcg import AmgLobpcgEigenSolver
+from src.services.eigen.lobpcg import LobpcgEigenSolver
+from src.services.eigen.shift_invert import ShiftInvertEigenSolver
+
+EIGEN_SOLVERS = {
+    "eigsh": ShiftInvertEigenSolver,
+    "lobpcg": LobpcgEigenSolver,
+    "amg_lobpcg": AmgLobpcgEigenSolver,
+}
+
+
+def build_eigen_solver(name):
+    """Building an eigen solver for normalized_cut by its name in ConfigDTO"""
+
+    if name not in EIGEN_SOLVERS:
+        raise ValueError(
+            "Unknown eigen solver {}, has to be in {}".format(name, list(EIGEN_SOLVERS))
+        )
+
+    return EIGEN_SOLVERS[name]()
@@ -0,0 +1,174 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import numpy as np
+import os
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from src.utils.metrics_utils import calculate_metrics_by_thresholds
+
+METRICS = ("precision", "recall", "fScore")
+
+
+def evaluate_window(window, load_window, instance_thresholds):
+    """Metrics of the window for each instance threshold, one row per threshold
+
+    Parameters
+    ----------
+    window : tuple
+        (sequence, start_index, end_index)
+    load_window : callable
+        load_window(window) returns the clusters, the trace and the GT instances
+        of the points of the window (see calculate_metrics_by_thresholds)
+    instance_thresholds : list of float
+        minimum percentages of the voxels of a cluster in GT instances
+
+    Returns
+    -------
+    columns : dict of arrays
+        the columns of the rows, there are no rows if the window has no GT instances
+    """
+
+    sequence, start_index, end_index = window
+    clusters, trace, inst_label_array_for_clustering = load_window(window)
+
+    rows_count = len(instance_thresholds)
+    if not np.any(inst_label_array_for_clustering):
+        rows_count = 0
+
+    columns = {
+        "sequence": np.full(rows_count, str(sequence)),
+        "start_index": np.full(rows_count, start_index),
+        "end_index": np.full(rows_count, end_index),
+        "instance_threshold": np.asarray(instance_thresholds, dtype=float)[:rows_count],
+        "clusters": np.full(rows_count, len(clusters)),
+    }
+    if rows_count == 0:
+        for name in METRICS:
+            columns[name] = np.zeros(0)
+        columns["gt_instances"] = columns["pred_instances"] = np.zeros(0, dtype=int)
+        return columns
+
+    columns.update(
+        calculate_metrics_by_thresholds(
+            inst_label_array_for_clustering, clusters, trace, instance_thresholds
+        )
+    )
+    return columns
+
+
+def evaluate_windows(
+    windows, load_window, instance_thresholds, num_workers=1, chunksize=16
+):
+    """Metrics of all windows for each instance threshold as columns of one table
+
+    The windows are evaluated by a pool of processes if num_workers > 1,
+    load_window has to be picklable then (e.g. a function of a module).
+    The windows without GT instances are skipped.
+    """
+
+    evaluate = functools.partial(
+        evaluate_window,
+        load_window=load_window,
+        instance_thresholds=instance_thresholds,
+    )
+
+    if num_workers <= 1:
+        window_columns = [evaluate(window) for window in windows]
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            window_columns = list(executor.map(evaluate, windows, chunksize=chunksize))
+
+    if not window_columns:
+        return {}
+
+    return {
+        name: np.concatenate([columns[name] for columns in window_columns])
+        for name in window_columns[0]
+    }
+
+
+def save_evaluation(path, columns):
+    """Saving the columns into one .npz file, the file is replaced after it is fully written"""
+
+    path = Path(path)
+    file, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp.npz")
+    with os.fdopen(file, "wb") as temp_file:
+        np.savez(temp_file, **columns)
+    os.replace(temp_path, path)
+
+
+def load_evaluation(path):
+    with np.load(path) as evaluation_file:
+        return {name: evaluation_file[name] for name in evaluation_file.files}
+
+
+def aggregate_metrics(columns, group_by=("sequence", "instance_threshold")):
+    """Mean of each metric and the fractions of windows where it is 1 and 0 for each group of rows
+
+    Parameters
+    ----------
+    columns : dict of arrays
+        the table of evaluate_windows
+    group_by : tuple of str
+        the columns whose values define the groups, all rows are one group if it is empty
+
+    Returns
+    -------
+    aggregates : dict of arrays
+        the columns of group_by, "windows" (the number of rows of a group) and
+        "<metric>_mean", "<metric>_ones", "<metric>_zeros" for each metric, one row per group
+    """
+
+    rows_count = len(columns["precision"])
+
+    group_ids = np.zeros(rows_count, dtype=int)
+    groups_count = min(rows_count, 1)
+    group_rows = np.zeros(groups_count, dtype=int)
+    for name in group_by:
+        # the groups are refined by each column, group_ids are numbered in sorted order
+        _, column_ids = np.unique(columns[name], return_inverse=True)
+        pairs, first_rows, group_ids = np.unique(
+            np.stack([group_ids, column_ids.ravel()], axis=1),
+            axis=0,
+            return_index=True,
+            return_inverse=True,
+        )
+        group_ids = group_ids.ravel()
+        groups_count = len(pairs)
+        group_rows = first_rows
+
+    windows = np.bincount(group_ids, minlength=groups_count)
+
+    aggregates = {name: np.asarray(columns[name])[group_rows] for name in group_by}
+    aggregates["windows"] = windows
+    for name in METRICS:
+        values = np.asarray(columns[name], dtype=float)
+        aggregates["{}_mean".format(name)] = (
+            np.bincount(group_ids, weights=values, minlength=groups_count) / windows
+        )
+        aggregates["{}_ones".format(name)] = (
+            np.bincount(group_ids, weights=values == 1.0, minlength=groups_count)
+            / windows
+        )
+        aggregates["{}_zeros".format(name)] = (
+            np.bincount(group_ids, weights=values == 0.0, minlength=groups_count)
+            / windows
+        )
+
+    return aggregates
@@ -0,0 +1,155 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import numpy as np
+import os
+import tempfile
+
+from collections import OrderedDict
+from pathlib import Path
+
+
+class LabelImageCache:
+    """Cache of the label images of segmented camera images after reduce_detail and masks_to_image.
+
+    A label image is addressed by the hash of the identifier of the masks of the image
+    (see AbstractDataset.get_image_instances_id), the camera name, the image index
+    and the thresholds of reduce_detail. The images are stored as uint16 .npy files
+    in cache_dir and the most recently used of them are also kept in memory.
+    Both levels are bounded and evict the least recently used images.
+
+    The size of the files is counted once when the cache is created and then updated by each write,
+    the directory is scanned again only when the counted size exceeds disk_size. The files written
+    by other processes are not counted until the next scan, so the directory can temporarily
+    exceed disk_size when several processes write to it.
+
+    With num_workers > 1 the instance matrix of each window is built by a new pool of processes,
+    each of them gets a copy of the cache with no images in memory. So only the files carry over
+    between the windows in that mode, the memory level serves the images of one window only.
+
+    Parameters
+    ----------
+    cache_dir : str or Path
+        directory of the .npy files, it is shared by all processes using the cache
+    memory_size : int
+        maximum number of label images kept in memory
+    disk_size : int
+        maximum total size in bytes of the files in cache_dir
+    """
+
+    def __init__(self, cache_dir, memory_size=64, disk_size=4 * 1024**3):
+        self.cache_dir = Path(cache_dir)
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.memory = OrderedDict()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.disk_usage = sum(size for _, size, _ in self.scan_disk())
+
+    def __getstate__(self):
+        # the images in memory are not copied to worker processes, they read the files
+        state = self.__dict__.copy()
+        state["memory"] = OrderedDict()
+        return state
+
+    @staticmethod
+    def build_key(
+        instances_id, cam_name, index, int_to_union_threshold, int_to_mask_threshold
+    ):
+        key = repr(
+            (
+                instances_id,
+                cam_name,
+                int(index),
+                float(int_to_union_threshold),
+                float(int_to_mask_threshold),
+            )
+        )
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        """The cached label image or None"""
+
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+
+        path = self.get_path(key)
+        try:
+            image_labels = np.load(path)
+            # the access time of a file is its position in the disk LRU order
+            os.utime(path)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+        self.put_in_memory(key, image_labels)
+        return image_labels
+
+    def put(self, key, image_labels):
+        """Saving the label image, the instance numbers have to fit into uint16"""
+
+        if image_labels.max(initial=0) > np.iinfo(np.uint16).max:
+            raise ValueError("Too many instances in the image for uint16 labels")
+        image_labels = image_labels.astype(np.uint16)
+
+        # the file is renamed after it is fully written, so other processes never read a part of it
+        path = self.get_path(key)
+        file, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(file, "wb") as temp_file:
+            np.save(temp_file, image_labels)
+        if path.exists():
+            self.disk_usage -= path.stat().st_size
+        self.disk_usage += Path(temp_path).stat().st_size
+        os.replace(temp_path, path)
+
+        self.put_in_memory(key, image_labels)
+        if self.disk_usage > self.disk_size:
+            self.evict_from_disk()
+
+        return image_labels
+
+    def get_path(self, key):
+        return self.cache_dir.joinpath("{}.npy".format(key))
+
+    def put_in_memory(self, key, image_labels):
+        self.memory[key] = image_labels
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def scan_disk(self):
+        """The access times, sizes and paths of the files in cache_dir"""
+
+        files = []
+        for path in self.cache_dir.glob("*.npy"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # evicted by another process
+            files.append((stat.st_mtime_ns, stat.st_size, path))
+
+        return files
+
+    def evict_from_disk(self):
+        files = self.scan_disk()
+
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total_size <= self.disk_size:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+        self.disk_usage = total_size
@@ -12,9 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import numpy as np
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 from scipy import sparse
 
+from src.services.eigen.shift_invert import ShiftInvertEigenSolver
+
 
 def cut_cost(W, mask):
     return (np.sum(W) - np.sum(W[mask][:, mask]) - np.sum(W[~mask][:, ~mask])) / 2
@@ -33,12 +41,77 @@ def ncut_cost(W, D, cut):
         current n-cut, whose cost needs to be calculated
     """
     cost = cut_cost(W, cut)
-    # Anastasiia: this also can be optimized in the future
-    assoc_a = D.todense()[cut].sum()
-    assoc_b = D.todense()[~cut].sum()
+    d = np.asarray(D.diagonal()).ravel()
+    assoc_a = d[cut].sum()
+    assoc_b = d[~cut].sum()
     return (cost / assoc_a) + (cost / assoc_b)
 
 
+def ncut_costs_by_thresholds(ev, D, W, thresholds):
+    """Calculating the value of the normalized similarity criterion for the cuts ev > t for all thresholds t at once
+
+    The vertices are sorted by the eigenvector values once, so that every cut is a prefix
+    of the sorted vertices. The association and cut values of all prefixes are accumulated
+    from the degree vector and the nonzero weights of W, so the cost of the calculation
+    does not depend on the number of thresholds.
+
+    Parameters
+    ----------
+    ev : eigenvector
+    D : matrix
+        diagonal matrix obtained by transforming the distance matrix
+    W : matrix
+        distance matrix, dense or scipy.sparse
+    thresholds : array
+        thresholds of the cuts, the vertices with ev > t form the first part of a cut
+    """
+
+    num_vertices = len(ev)
+
+    # rank of a vertex is its position when the vertices are sorted by ev in descending order,
+    # so the first part of a cut with k vertices consists of the vertices with rank < k
+    order = np.argsort(-ev, kind="stable")
+    rank = np.empty(num_vertices, dtype=int)
+    rank[order] = np.arange(num_vertices)
+
+    W_coo = sparse.coo_matrix(W)
+    rank_row, rank_col = rank[W_coo.row], rank[W_coo.col]
+
+    # sum of weights inside the first part (both ends have rank < k)
+    within_a = np.zeros(num_vertices + 1)
+    within_a[1:] = np.cumsum(
+        np.bincount(np.maximum(rank_row, rank_col), W_coo.data, minlength=num_vertices)
+    )
+    # sum of weights inside the second part (both ends have rank >= k)
+    within_b = np.zeros(num_vertices + 1)
+    within_b[:-1] = np.cumsum(
+        np.bincount(np.minimum(rank_row, rank_col), W_coo.data, minlength=num_vertices)[
+            ::-1
+        ]
+    )[::-1]
+
+    cut = (W_coo.data.sum() - within_a - within_b) / 2
+
+    d = np.asarray(D.diagonal()).ravel()[order]
+    assoc_a = np.zeros(num_vertices + 1)
+    assoc_a[1:] = np.cumsum(d)
+    assoc_b = np.zeros(num_vertices + 1)
+    assoc_b[:-1] = np.cumsum(d[::-1])[::-1]
+
+    cut_sizes = num_vertices - np.searchsorted(np.sort(ev), thresholds, side="right")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        costs = (cut[cut_sizes] / assoc_a[cut_sizes]) + (
+            cut[cut_sizes] / assoc_b[cut_sizes]
+        )
+
+    # An empty or a full first part is not a cut, the residual of the cut value
+    # divided by the zero association can have any sign
+    costs[(cut_sizes == 0) | (cut_sizes == num_vertices)] = np.inf
+
+    return costs
+
+
 def get_min_ncut(ev, d, w, num_cuts):
     """Construction of a minimal graph cut based on a normalized similarity criterion
 
@@ -54,31 +127,55 @@ def get_min_ncut(ev, d, w, num_cuts):
     """
 
     mcut = np.inf
+    min_mask = np.zeros_like(ev, dtype=bool)
+
+    # The eigen solver can fail to converge and return a vector of NaN,
+    # no cut is made by it
+    if not np.all(np.isfinite(ev)):
+        return min_mask, mcut
+
     mn = ev.min()
     mx = ev.max()
 
     # If all values in `ev` are equal, it implies that the graph can't be
     # further sub-divided. In this case the bi-partition is the graph
     # itself and an empty set.
-    min_mask = np.zeros_like(ev, dtype=bool)
     if np.allclose(mn, mx):
         return min_mask, mcut
 
     # Refer Shi & Malik 2001, Section 3.1.3, Page 892
     # Perform evenly spaced n-cuts and determine the optimal one.
-    for t in np.linspace(mn, mx, num_cuts, endpoint=False):
-        mask = ev > t
-        cost = ncut_cost(w, d, mask)
-        if cost < mcut:
-            min_mask = mask
-            mcut = cost
+    thresholds = np.linspace(mn, mx, num_cuts, endpoint=False)
+    costs = ncut_costs_by_thresholds(ev, d, w, thresholds)
+    costs[np.isnan(costs)] = np.inf
+
+    min_index = np.argmin(costs)
+    if costs[min_index] < mcut:
+        min_mask = ev > thresholds[min_index]
+        mcut = costs[min_index]
 
     return min_mask, mcut
 
 
-def normalized_cut(w, labels, T, eigenvalues_count=2):
+def normalized_cut(
+    w,
+    labels,
+    T,
+    eigenvalues_count=2,
+    num_cuts=10,
+    num_workers=1,
+    pool="thread",
+    eigen_solver=None,
+    warm_start=False,
+    components=None,
+):
     """Implementation of the GraphCut algorithm for segmentation labels based on a matrix of distances W between them
 
+    The graph is divided iteratively: each partition of the graph is a set of indices into the matrix w,
+    the partitions waiting to be divided are kept in a work queue. The two parts of a divided partition
+    are independent, so with num_workers > 1 partitions are processed concurrently.
+    If the graph consists of several components, each component is a separate initial partition.
+
     Parameters
     ----------
     w : matrix
@@ -86,40 +183,188 @@ def normalized_cut(w, labels, T, eigenvalues_count=2):
     labels : array
         objects that will be divided into clusters; cloud points
     T : float
-        criterion for stopping recursive calls to the algorithm
+        criterion for stopping the division of a partition
     eigenvalues_count : int
         number of eigenvalues that need to be calculated during the algorithm
+    num_cuts : int
+        number of generated graph cuts, among which the minimum will be selected
+    num_workers : int
+        number of partitions processed concurrently
+    pool : str
+        "thread" or "process", the kind of pool used when num_workers > 1.
+        ARPACK iterations of eigsh are serialized between threads by scipy,
+        the process pool copies w to every worker once
+    eigen_solver : IEigenSolver
+        solver of the eigenproblem of each division, ShiftInvertEigenSolver if None
+    warm_start : bool
+        if true, the Fiedler vector of the divided partition restricted to each of its parts
+        is the initial approximation of the eigenvector of the part
+    components : array
+        number of the connected component of each label, the labels with a negative number are skipped.
+        The components are divided independently, the whole graph is divided if None
+
+    Returns
+    -------
+    clusters : list of arrays
+        labels of each cluster, in the same order as the recursive division gives them,
+        the clusters of the components follow in the order of the components
     """
 
+    if sparse.issparse(w):
+        w = sparse.csr_matrix(w)
+
+    if eigen_solver is None:
+        eigen_solver = ShiftInvertEigenSolver()
+
+    if components is None:
+        partitions = [np.arange(w.shape[0])]
+    else:
+        partitions = [
+            np.flatnonzero(components == component)
+            for component in range(np.max(components, initial=-1) + 1)
+        ]
+    roots = list(range(len(partitions)))
+    children = {}
+    start_vectors = {}
+
+    if num_workers > 1:
+        if pool == "process":
+            executor = ProcessPoolExecutor(
+                max_workers=num_workers,
+                initializer=init_partition_worker,
+                initargs=(w,),
+            )
+            divide = divide_partition_in_worker
+        else:
+            executor = ThreadPoolExecutor(max_workers=num_workers)
+            divide = functools.partial(divide_partition, w)
+
+        def submit(partition):
+            return executor.submit(
+                divide,
+                partitions[partition],
+                T,
+                eigenvalues_count,
+                num_cuts,
+                eigen_solver,
+                start_vectors.pop(partition, None),
+            )
+
+        with executor:
+            futures = {submit(root): root for root in roots}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    partition = futures.pop(future)
+                    mask, ev = future.result()
+                    new_children = add_children(partitions, children, partition, mask)
+                    # the start vectors are taken by submit, so they are added before it
+                    if warm_start:
+                        add_start_vectors(start_vectors, children, partition, mask, ev)
+                    for child in new_children:
+                        futures[submit(child)] = child
+    else:
+        queue = list(reversed(roots))
+        while queue:
+            partition = queue.pop()
+            mask, ev = divide_partition(
+                w,
+                partitions[partition],
+                T,
+                eigenvalues_count,
+                num_cuts,
+                eigen_solver,
+                start_vectors.pop(partition, None),
+            )
+            # the first part is divided first, as in the recursive division
+            queue.extend(reversed(add_children(partitions, children, partition, mask)))
+            if warm_start:
+                add_start_vectors(start_vectors, children, partition, mask, ev)
+
+    # The clusters are collected in the order of depth-first traversal of the division tree
+    clusters = []
+    stack = list(reversed(roots))
+    while stack:
+        partition = stack.pop()
+        if partition in children:
+            stack.extend(reversed(children[partition]))
+        else:
+            clusters.append(labels[partitions[partition]])
+
+    return clusters
+
+
+def add_children(partitions, children, partition, mask):
+    """Adding two parts of the divided partition to the list of partitions, returns their numbers"""
+
+    if mask is None:
+        return []
+
+    indices = partitions[partition]
+    partitions.extend([indices[mask], indices[~mask]])
+    children[partition] = (len(partitions) - 2, len(partitions) - 1)
+
+    return children[partition]
+
+
+def add_start_vectors(start_vectors, children, partition, mask, ev):
+    """Restricting the Fiedler vector of the divided partition to its parts"""
+
+    if mask is not None:
+        start_vectors[children[partition][0]] = ev[mask]
+        start_vectors[children[partition][1]] = ev[~mask]
+
+
+def divide_partition(w, indices, T, eigenvalues_count, num_cuts, eigen_solver, v0):
+    """One step of the GraphCut algorithm for the subgraph of w on the given indices
+
+    Returns the mask of the first part of the minimal cut if its cost is less than T, otherwise None,
+    and the Fiedler vector of the subgraph
+    """
+
+    if len(indices) <= 2:
+        return None, None
+
+    # The submatrix is sliced by rows and then by columns, as in the recursive division,
+    # so that the degrees are summed in the same order and the cuts are the same
+    if len(indices) < w.shape[0]:
+        w = w[indices][:, indices]
+
     W = w + sparse.identity(w.shape[0])
 
-    if W.shape[0] > 2:
-        d = np.array(W.sum(axis=0))[0]
-        d2 = np.reciprocal(d)
-        D = sparse.diags(d)
-        D2 = sparse.diags(d2)
+    d = np.array(W.sum(axis=0))[0]
+    d2 = np.reciprocal(d)
+    D = sparse.diags(d)
+    D2 = sparse.diags(d2)
 
-        A = D2 * (D - W) * D2
+    A = D2 * (D - W) * D2
 
-        eigvals, eigvecs = sparse.linalg.eigsh(
-            A, eigenvalues_count, sigma=0, which="LM"
-        )
+    eigvals, eigvecs = eigen_solver.solve(A, eigenvalues_count, v0)
 
-        index2 = np.argsort(eigvals)[1]
+    index2 = np.argsort(eigvals)[1]
 
-        ev = eigvecs[:, index2]
+    ev = eigvecs[:, index2]
 
-        mask, mcut = get_min_ncut(ev, D, w, 10)
+    mask, mcut = get_min_ncut(ev, D, w, num_cuts)
 
-        if mcut < T:
-            labels1 = normalized_cut(
-                w[mask][:, mask], labels[mask], T, eigenvalues_count
-            )
-            labels2 = normalized_cut(
-                w[~mask][:, ~mask], labels[~mask], T, eigenvalues_count
-            )
-            return labels1 + labels2
-        else:
-            return [labels]
+    if mcut < T:
+        return mask, ev
     else:
-        return [labels]
+        return None, ev
+
+
+# The distance matrix of the worker process of the process pool in normalized_cut
+partition_worker_w = None
+
+
+def init_partition_worker(w):
+    global partition_worker_w
+    partition_worker_w = w
+
+
+def divide_partition_in_worker(
+    indices, T, eigenvalues_count, num_cuts, eigen_solver, v0
+):
+    return divide_partition(
+        partition_worker_w, indices, T, eigenvalues_count, num_cuts, eigen_solver, v0
+    )
@@ -15,6 +15,9 @@
 import attr
 
 from src.datasets.abstract_dataset import AbstractDataset
+from src.services.eigen.solvers import EIGEN_SOLVERS
+from src.services.label_image_cache import LabelImageCache
+from src.services.scan_cache import ScanCache
 
 
 def is_positive(instance, attribute, value):
@@ -22,6 +25,11 @@ def is_positive(instance, attribute, value):
         raise ValueError("{} has to be positive!".format(attribute.name))
 
 
+def is_not_negative(instance, attribute, value):
+    if value < 0:
+        raise ValueError("{} has to be non-negative!".format(attribute.name))
+
+
 def is_valid_cam_name(instance, attribute, value):
     if value != "cam0" and value != "cam1" and value != "cam2" and value != "cam3":
         raise ValueError(
@@ -29,6 +37,23 @@ def is_valid_cam_name(instance, attribute, value):
         )
 
 
+def is_valid_cam_names(instance, attribute, value):
+    for cam_name in value:
+        is_valid_cam_name(instance, attribute, cam_name)
+
+
+def is_valid_eigen_solver(instance, attribute, value):
+    if value not in EIGEN_SOLVERS:
+        raise ValueError(
+            "{} has to be in [{}]!".format(attribute.name, ", ".join(EIGEN_SOLVERS))
+        )
+
+
+def is_valid_visibility_engine(instance, attribute, value):
+    if value != "hpr" and value != "z_buffer":
+        raise ValueError("{} has to be in [hpr, z_buffer]!".format(attribute.name))
+
+
 def end_greater_than_start(instance, attribute, value):
     if value <= instance.start_index:
         raise ValueError("'end_index' has to be more than 'start_index'!")
@@ -57,6 +82,10 @@ class ConfigDTO:
        offset of the first number of images of the covering sequence relative to the start cloud
     cam_name : str
        name of the camera whose images will be used
+    cam_names : list
+       names of the cameras whose images are used to build the instance matrix,
+       the matrix has a column for each pair of a camera and an image, only cam_name is used if None,
+       the cube of R is still placed at cam_name
     R : int
        side of a cube within which points are considered
     nb_neighbors : int
@@ -65,6 +94,42 @@ class ConfigDTO:
        the threshold level in the statistical outlier removal function
     voxel_size : float
        voxel size to downsample into
+    sparse_distance_matrix : bool
+       if true, the distance matrix is built as a scipy.sparse.csr_matrix
+       from pairs of close points only, otherwise a dense matrix is built
+    eigen_solver : str
+       solver of the eigenproblems of the normalized cut: eigsh (shift-invert Lanczos),
+       lobpcg or amg_lobpcg (LOBPCG preconditioned by algebraic multigrid, requires pyamg)
+    eigen_warm_start : bool
+       if true, the eigenproblem of each part of a divided partition starts from
+       the Fiedler vector of the partition restricted to the part
+    min_component_size : int
+       connected components of the distance graph with at least this number of points
+       are segmented independently, only the largest component is segmented if None
+    num_workers : int
+       number of processes building the columns of the instance matrix
+       and dividing the connected components in parallel,
+       the images and the components are processed sequentially if it is 1
+    visibility_engine : str
+       engine removing the points hidden from the camera: hpr (hidden point removal of open3d)
+       or z_buffer (depth buffer of the image)
+    frustum_margin : float
+       if given, only the points in front of the camera that are projected at most frustum_margin pixels
+       outside the image are considered in the hidden point removal, all points are considered if None
+    z_buffer_scale : float
+       scale of the depth buffer relative to the image in the z_buffer engine
+    z_buffer_splat_size : int
+       each point covers the square of (2 * z_buffer_splat_size + 1) pixels of the depth buffer
+       in the z_buffer engine
+    z_buffer_depth_tolerance : float
+       a point is visible in the z_buffer engine if its depth exceeds the nearest depth of its pixel
+       by at most z_buffer_depth_tolerance of that depth
+    label_image_cache : LabelImageCache
+       cache of the label images of segmented images after reducing their detail,
+       the masks are processed for every window if it is None
+    scan_cache : ScanCache
+       ring buffer of the clouds transformed to the world coordinate system shared by consecutive windows,
+       the clouds are loaded for every window if it is None
     """
 
     dataset: AbstractDataset = attr.ib()
@@ -111,6 +176,19 @@ class ConfigDTO:
         default="cam2", validator=[attr.validators.instance_of(str), is_valid_cam_name]
     )
 
+    cam_names: list = attr.ib(
+        default=None,
+        validator=[
+            attr.validators.optional(
+                attr.validators.deep_iterable(
+                    member_validator=attr.validators.instance_of(str),
+                    iterable_validator=attr.validators.instance_of(list),
+                )
+            ),
+            attr.validators.optional(is_valid_cam_names),
+        ],
+    )
+
     R: int = attr.ib(
         default=12, validator=[attr.validators.instance_of(int), is_positive]
     )
@@ -125,3 +203,65 @@ class ConfigDTO:
     voxel_size: float = attr.ib(
         default=0.3, validator=[attr.validators.instance_of(float), is_positive]
     )
+
+    sparse_distance_matrix: bool = attr.ib(
+        default=False, validator=[attr.validators.instance_of(bool)]
+    )
+
+    eigen_solver: str = attr.ib(
+        default="eigsh",
+        validator=[attr.validators.instance_of(str), is_valid_eigen_solver],
+    )
+
+    eigen_warm_start: bool = attr.ib(
+        default=False, validator=[attr.validators.instance_of(bool)]
+    )
+
+    min_component_size: int = attr.ib(
+        default=None,
+        validator=[
+            attr.validators.optional(attr.validators.instance_of(int)),
+            attr.validators.optional(is_positive),
+        ],
+    )
+
+    num_workers: int = attr.ib(
+        default=1, validator=[attr.validators.instance_of(int), is_positive]
+    )
+
+    visibility_engine: str = attr.ib(
+        default="hpr",
+        validator=[attr.validators.instance_of(str), is_valid_visibility_engine],
+    )
+
+    frustum_margin: float = attr.ib(
+        default=None,
+        validator=[
+            attr.validators.optional(attr.validators.instance_of((int, float))),
+            attr.validators.optional(is_not_negative),
+        ],
+    )
+
+    z_buffer_scale: float = attr.ib(
+        default=0.5, validator=[attr.validators.instance_of(float), is_positive]
+    )
+
+    z_buffer_splat_size: int = attr.ib(
+        default=0, validator=[attr.validators.instance_of(int), is_not_negative]
+    )
+
+    z_buffer_depth_tolerance: float = attr.ib(
+        default=0.05, validator=[attr.validators.instance_of(float), is_not_negative]
+    )
+
+    label_image_cache: LabelImageCache = attr.ib(
+        default=None,
+        validator=[
+            attr.validators.optional(attr.validators.instance_of(LabelImageCache))
+        ],
+    )
+
+    scan_cache: ScanCache = attr.ib(
+        default=None,
+        validator=[attr.validators.optional(attr.validators.instance_of(ScanCache))],
+    )
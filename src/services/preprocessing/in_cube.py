@@ -12,7 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import copy
 import numpy as np
 import zope.interface
 
@@ -53,10 +52,8 @@ class SelectionInCubeProcessor:
             side of a cube
         """
 
-        pcd_centered = copy.deepcopy(pcd).transform(np.linalg.inv(center))
-        points = np.asarray(pcd_centered.points)
+        # only the z coordinate of the points in the center frame is used
+        T = np.linalg.inv(center)
+        z = np.asarray(pcd.points) @ T[2, :3] + T[2, 3]
 
-        vectors = np.array([[0, 0, point[2]] for point in points])
-        dists = np.linalg.norm(vectors, axis=1)
-
-        return np.where(dists < R)[0]
+        return np.where(np.abs(z) < R)[0]
@@ -12,15 +12,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import copy
 import numpy as np
 import zope.interface
 
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
 from src.services.preprocessing.common.interface import IProcessor
+from src.services.visibility.engines import build_visibility_engine
+from src.services.visibility.hidden_point_removal import (
+    HiddenPointRemovalVisibilityEngine,
+)
 from src.utils.geometry_utils import calculate_area
-from src.utils.pcd_utils import get_subpcd
-from src.utils.pcd_utils import get_visible_points
-from src.utils.sam_mask_utils import find_intersection_mask
+from src.utils.pcd_utils import is_in_image
+from src.utils.pcd_utils import project_points_to_views
+from src.utils.sam_mask_utils import find_intersection_area
 from src.utils.sam_mask_utils import find_union_mask
 
 
@@ -30,17 +36,27 @@ class InitInstancesMatrixProcessor:
         """Constructing an instance matrix for pcd.
 
         The pcd is covered with a sequence of images from (config.start_index - config.start_image_index_offset)
-        to config.end_index. The images are already segmented at this point.
+        to config.end_index of each camera of config.cam_names (config.cam_name if it is None).
+        The images are already segmented at this point.
         """
 
         points2instances = self.build_points2instances_matrix(
             pcd,
             config.dataset,
-            config.cam_name,
+            config.cam_names if config.cam_names is not None else config.cam_name,
             config.start_index - config.start_image_index_offset,
             config.end_index,
             config.reduce_detail_int_to_union_threshold,
             config.reduce_detail_int_to_mask_threshold,
+            config.num_workers,
+            config.label_image_cache,
+            build_visibility_engine(
+                config.visibility_engine,
+                config.frustum_margin,
+                config.z_buffer_scale,
+                config.z_buffer_splat_size,
+                config.z_buffer_depth_tolerance,
+            ),
         )
 
         return points2instances
@@ -49,82 +65,250 @@ class InitInstancesMatrixProcessor:
         self,
         map_wc,
         dataset,
-        cam_name,
+        cam_names,
         start_image_index,
         end_image_index,
         reduce_detail_int_to_union_threshold,
         reduce_detail_int_to_mask_threshold,
+        num_workers=1,
+        label_image_cache=None,
+        visibility_engine=None,
     ):
         """The map is moved to the camera coordinate system at the moment the current image is taken.
-        The function for removing hidden points is called (get_visible_points).
+        The hidden points are removed by visibility_engine (IVisibilityEngine),
+        by the hidden point removal of open3d if it is None.
 
         Cloud points are related to pixels. The instance number of the corresponding pixel is written into
         the points2instances matrix for the point and the current image.
 
-        The action is repeated for all images.
+        The action is repeated for all images of all cameras of cam_names (a camera name or a list of them),
+        the matrix has a column for each pair of a camera and an image, the columns of the images of the first
+        camera go first. The images taken at the same moment by all cameras are processed together,
+        the map is projected into them at once. The moments are processed one by one, the map in the camera
+        frames of each moment is written into the same buffer, so the memory grows with the number of cameras
+        but not with the number of images. The moments are independent of each other, so with num_workers > 1
+        they are processed by a pool of processes, each process has its own buffer of the map. The map points
+        and the points2instances matrix are placed in shared memory, each process writes
+        the columns of its images directly into the matrix.
+
+        If label_image_cache is given, the label images of segmented images are taken from it
+        instead of reducing the detail of their masks again.
         """
 
-        N = np.asarray(map_wc.points).shape[0]
-        points2instances = np.zeros((N, end_image_index - start_image_index), dtype=int)
+        if visibility_engine is None:
+            visibility_engine = HiddenPointRemovalVisibilityEngine()
+
+        if isinstance(cam_names, str):
+            cam_names = [cam_names]
+
+        points = np.asarray(map_wc.points)
+        N = points.shape[0]
+        views = list(range(start_image_index, end_image_index))
+        image_count = len(cam_names) * len(views)
+        # the columns of the images of each view taken by all cameras
+        views_ids = [
+            [cam_id * len(views) + view_id for cam_id in range(len(cam_names))]
+            for view_id in range(len(views))
+        ]
+
+        if num_workers <= 1 or len(views) <= 1:
+            points2instances = np.zeros((N, image_count), dtype=int)
+            # the map in the camera frames of each view is written into the same buffer
+            points_cc = np.empty((len(cam_names), N, 3), dtype=points.dtype)
+            for view_ids, view in zip(views_ids, views):
+                self.fill_view_instances(
+                    points2instances,
+                    view_ids,
+                    points,
+                    dataset,
+                    cam_names,
+                    view,
+                    reduce_detail_int_to_union_threshold,
+                    reduce_detail_int_to_mask_threshold,
+                    label_image_cache,
+                    points_cc,
+                    visibility_engine,
+                )
+
+            return points2instances
 
-        for view_id, view in enumerate(range(start_image_index, end_image_index)):
-            full_masks = dataset.get_image_instances(cam_name, view)
-            masks = self.reduce_detail(
-                full_masks,
-                reduce_detail_int_to_union_threshold,
-                reduce_detail_int_to_mask_threshold,
+        points_memory = shared_memory.SharedMemory(create=True, size=points.nbytes)
+        matrix_memory = shared_memory.SharedMemory(
+            create=True, size=N * image_count * np.dtype(int).itemsize
+        )
+        try:
+            np.ndarray(points.shape, dtype=points.dtype, buffer=points_memory.buf)[
+                :
+            ] = points
+            shared_points2instances = np.ndarray(
+                (N, image_count), dtype=int, buffer=matrix_memory.buf
             )
-            image_labels = self.masks_to_image(masks)
+            shared_points2instances[:] = 0
+
+            with ProcessPoolExecutor(
+                max_workers=min(num_workers, len(views)),
+                initializer=init_view_worker,
+                initargs=(
+                    points_memory.name,
+                    matrix_memory.name,
+                    points.shape,
+                    points.dtype,
+                    image_count,
+                    dataset,
+                    cam_names,
+                    reduce_detail_int_to_union_threshold,
+                    reduce_detail_int_to_mask_threshold,
+                    label_image_cache,
+                    visibility_engine,
+                ),
+            ) as executor:
+                list(executor.map(fill_view_instances_in_worker, views_ids, views))
+
+            points2instances = shared_points2instances.copy()
+            del shared_points2instances
+        finally:
+            points_memory.close()
+            points_memory.unlink()
+            matrix_memory.close()
+            matrix_memory.unlink()
+
+        return points2instances
+
+    def fill_view_instances(
+        self,
+        points2instances,
+        view_ids,
+        points,
+        dataset,
+        cam_names,
+        view,
+        reduce_detail_int_to_union_threshold,
+        reduce_detail_int_to_mask_threshold,
+        label_image_cache=None,
+        points_cc=None,
+        visibility_engine=None,
+    ):
+        """Writing the instance numbers of the images view of the cameras cam_names
+        into the view_ids columns of points2instances
 
-            T = dataset.get_lidar_pose(view)
-            T_cam = T @ np.linalg.inv(dataset.get_camera_extrinsics(cam_name))
+        points are the points of the map in the world coordinate system, they are projected into
+        the images of all cameras at once (project_points_to_views). The points in the camera frames
+        are written into the (cameras, N, 3) buffer points_cc if it is given
+        """
 
-            map_cc = copy.deepcopy(map_wc).transform(
-                np.linalg.inv(T_cam)
-            )  # map in camera frame
-            indices_visible = get_visible_points(map_cc)
-            map_cc_visible = get_subpcd(map_cc, indices_visible)
+        if visibility_engine is None:
+            visibility_engine = HiddenPointRemovalVisibilityEngine()
 
-            points_to_pixels = self.get_points_to_pixels(
-                np.asarray(map_cc_visible.points),
-                dataset.get_camera_intrinsics(cam_name),
-                ((image_labels.shape[1], image_labels.shape[0])),
+        images_labels = [
+            self.get_image_labels(
+                dataset,
+                cam_name,
+                view,
+                reduce_detail_int_to_union_threshold,
+                reduce_detail_int_to_mask_threshold,
+                label_image_cache,
+            )
+            for cam_name in cam_names
+        ]
+        img_shapes = [
+            (image_labels.shape[1], image_labels.shape[0])
+            for image_labels in images_labels
+        ]
+
+        points_cc, pixels, depths, in_frustum = project_points_to_views(
+            points,
+            self.get_camera_transforms(dataset, cam_names, view),
+            [dataset.get_camera_intrinsics(cam_name) for cam_name in cam_names],
+            img_shapes,
+            visibility_engine.margin,
+            out=points_cc,
+        )  # map in camera frames
+
+        for cam_id, view_id in enumerate(view_ids):
+            img_shape = img_shapes[cam_id]
+            indices = np.flatnonzero(in_frustum[cam_id])
+            cam_pixels = pixels[cam_id, indices]
+
+            # the projection is shared by the visibility engine and the matching of points to pixels
+            visible = visibility_engine.get_visible_points(
+                points_cc[cam_id],
+                (indices, cam_pixels, depths[cam_id, indices]),
+                img_shape,
             )
+            visible &= is_in_image(cam_pixels, img_shape)
 
-            for point_id, pixel_id in points_to_pixels.items():
-                points2instances[indices_visible[point_id], view_id] = int(
-                    image_labels[pixel_id[1], pixel_id[0]]
-                )
+            cam_pixels = cam_pixels[visible].astype(int)
+            points2instances[indices[visible], view_id] = images_labels[cam_id][
+                cam_pixels[:, 1], cam_pixels[:, 0]
+            ]
 
-        return points2instances
+    def get_camera_transforms(self, dataset, cam_names, view):
+        """The transformations of the map from the world coordinate system
+        to the coordinate systems of the cameras at the moment the image view is taken
 
-    def get_points_to_pixels(self, points, cam_intrinsics, img_shape):
-        """The points of the cloud are matched to the pixels of the image"""
+        The pose of the lidar at that moment is shared by all cameras,
+        each camera adds its extrinsics to it
+        """
 
-        img_width, img_height = img_shape
+        T = dataset.get_lidar_pose(view)
 
-        points_proj = cam_intrinsics @ points.T
-        points_proj[:2, :] /= points_proj[2, :]
-        points_coord = points_proj.T
+        return [
+            np.linalg.inv(T @ np.linalg.inv(dataset.get_camera_extrinsics(cam_name)))
+            for cam_name in cam_names
+        ]
 
-        inds = np.where(
-            (points_coord[:, 0] < img_width)
-            & (points_coord[:, 0] >= 0)
-            & (points_coord[:, 1] < img_height)
-            & (points_coord[:, 1] >= 0)
-            & (points_coord[:, 2] > 0)
-        )[0]
+    def get_image_labels(
+        self,
+        dataset,
+        cam_name,
+        view,
+        reduce_detail_int_to_union_threshold,
+        reduce_detail_int_to_mask_threshold,
+        label_image_cache=None,
+    ):
+        """The image of instance numbers of the segmented image view after reducing the detail of its masks"""
+
+        key = None
+        if label_image_cache is not None:
+            instances_id = dataset.get_image_instances_id(cam_name, view)
+            if instances_id is not None:
+                key = label_image_cache.build_key(
+                    instances_id,
+                    cam_name,
+                    view,
+                    reduce_detail_int_to_union_threshold,
+                    reduce_detail_int_to_mask_threshold,
+                )
+                image_labels = label_image_cache.get(key)
+                if image_labels is not None:
+                    return image_labels
+
+        full_masks = dataset.get_image_instances(cam_name, view)
+        masks = self.reduce_detail(
+            full_masks,
+            reduce_detail_int_to_union_threshold,
+            reduce_detail_int_to_mask_threshold,
+        )
+        if len(masks) > 0:
+            image_labels = self.masks_to_image(masks)
+        else:
+            # the image without masks gives no instances to its points
+            image_shape = dataset.get_camera_image(cam_name, view).shape[:2]
+            image_labels = self.masks_to_image(masks, image_shape)
 
-        points_ind_to_pixels = {}
-        for ind in inds:
-            points_ind_to_pixels[ind] = points_coord[ind][:2].astype(int)
+        if key is not None:
+            image_labels = label_image_cache.put(key, image_labels)
 
-        return points_ind_to_pixels
+        return image_labels
 
-    def masks_to_image(self, masks):
-        """Assigning instance numbers for each mask of a segmented image"""
+    def masks_to_image(self, masks, image_shape=None):
+        """Assigning instance numbers for each mask of a segmented image,
+        image_shape is required only if there are no masks
+        """
 
-        image_labels = np.zeros(masks[0]["segmentation"].shape)
+        if image_shape is None:
+            image_shape = masks[0]["segmentation"].shape
+        image_labels = np.zeros(image_shape, dtype=np.uint16)
         for i, mask in enumerate(masks):
             image_labels[mask["segmentation"]] = i + 1
         return image_labels
@@ -159,53 +343,122 @@ class InitInstancesMatrixProcessor:
             with another mask, then combine them into one mask
         """
 
+        # The masks are not changed in place, only the merged masks are new
+        masks = list(masks)
+
+        bboxes = np.array([mask["bbox"] for mask in masks]).reshape(-1, 4)
+        x1, y1 = bboxes[:, 0], bboxes[:, 1]
+        x2, y2 = x1 + bboxes[:, 2], y1 + bboxes[:, 3]
+
+        merged = np.zeros(len(masks), dtype=bool)  # masks that were merged
         merged_mask = []
-        merged_indices = []  # indices in the original masks that were merged
 
         for i in range(len(masks)):
-            if i in merged_indices:
+            if merged[i]:
                 continue
 
             area_bbox_i = calculate_area(masks[i]["bbox"])
 
-            indices_merged_with_i = []
-            for j in range(i + 1, len(masks)):
-                if j in merged_indices:
-                    continue
-
-                area_bbox_j = calculate_area(masks[j]["bbox"])
-
-                intersection_mask = find_intersection_mask(masks[i], masks[j])
-                if intersection_mask == None:
-                    continue
-                area_intersection = intersection_mask["area"]
-
-                area_bbox_intersection = calculate_area(intersection_mask["bbox"])
-                area_bbox_union = area_bbox_i + area_bbox_j - area_bbox_intersection
-                IU_ratio = area_bbox_intersection / area_bbox_union
-
-                if (
-                    IU_ratio >= int_to_union_threshold
-                    or area_intersection / masks[i]["area"] >= int_to_mask_threshold
-                    or area_intersection / masks[j]["area"] >= int_to_mask_threshold
-                ):
-                    masks[i] = find_union_mask(masks[i], masks[j])
-                    indices_merged_with_i.append(j)
-
-            if indices_merged_with_i:
+            # Only the later masks whose boxes intersect the box of the mask i are compared with it.
+            # The box of the mask i grows after each merge, then the search is repeated
+            # for the masks after the merged one
+            start_j = i + 1
+            while start_j < len(masks):
+                x, y, w, h = masks[i]["bbox"]
+                candidates = start_j + np.flatnonzero(
+                    ~merged[start_j:]
+                    & (x1[start_j:] <= x + w)
+                    & (x2[start_j:] >= x)
+                    & (y1[start_j:] <= y + h)
+                    & (y2[start_j:] >= y)
+                )
+                start_j = len(masks)
+
+                for j in candidates:
+                    area_bbox_j = calculate_area(masks[j]["bbox"])
+
+                    area_intersection, bbox_intersection = find_intersection_area(
+                        masks[i], masks[j]
+                    )
+
+                    area_bbox_intersection = calculate_area(bbox_intersection)
+                    area_bbox_union = area_bbox_i + area_bbox_j - area_bbox_intersection
+                    IU_ratio = area_bbox_intersection / area_bbox_union
+
+                    if (
+                        IU_ratio >= int_to_union_threshold
+                        or area_intersection / masks[i]["area"] >= int_to_mask_threshold
+                        or area_intersection / masks[j]["area"] >= int_to_mask_threshold
+                    ):
+                        masks[i] = find_union_mask(masks[i], masks[j])
+                        merged[i] = merged[j] = True
+                        start_j = j + 1
+                        break
+
+            if merged[i]:
                 # the final result of the union is extracted from the masks[i]
                 merged_mask.append(masks[i])
 
-                merged_indices.append(i)
-                for ind in indices_merged_with_i:
-                    merged_indices.append(ind)
+        masks_result = [mask for ind, mask in enumerate(masks) if not merged[ind]]
+        masks_result.extend(merged_mask)
 
-        masks_result = []
-        for ind, mask in enumerate(masks):
-            if ind not in merged_indices:
-                masks_result.append(mask)  # save it unchanged
+        return masks_result
 
-        for mask in merged_mask:
-            masks_result.append(mask)
 
-        return masks_result
+# The state of the worker process of the process pool in build_points2instances_matrix
+view_worker_state = None
+
+
+def init_view_worker(
+    points_name,
+    matrix_name,
+    points_shape,
+    points_dtype,
+    image_count,
+    dataset,
+    cam_names,
+    reduce_detail_int_to_union_threshold,
+    reduce_detail_int_to_mask_threshold,
+    label_image_cache,
+    visibility_engine,
+):
+    global view_worker_state
+
+    points_memory = shared_memory.SharedMemory(name=points_name)
+    matrix_memory = shared_memory.SharedMemory(name=matrix_name)
+
+    # the points are read with the shape and the type they are written with
+    points = np.ndarray(points_shape, dtype=points_dtype, buffer=points_memory.buf)
+    points_count = points_shape[0]
+
+    view_worker_state = {
+        "memory": (points_memory, matrix_memory),
+        "points": points,
+        "points_cc": np.empty((len(cam_names), points_count, 3), dtype=points.dtype),
+        "points2instances": np.ndarray(
+            (points_count, image_count), dtype=int, buffer=matrix_memory.buf
+        ),
+        "dataset": dataset,
+        "cam_names": cam_names,
+        "thresholds": (
+            reduce_detail_int_to_union_threshold,
+            reduce_detail_int_to_mask_threshold,
+        ),
+        "label_image_cache": label_image_cache,
+        "visibility_engine": visibility_engine,
+    }
+
+
+def fill_view_instances_in_worker(view_ids, view):
+    InitInstancesMatrixProcessor().fill_view_instances(
+        view_worker_state["points2instances"],
+        view_ids,
+        view_worker_state["points"],
+        view_worker_state["dataset"],
+        view_worker_state["cam_names"],
+        view,
+        *view_worker_state["thresholds"],
+        view_worker_state["label_image_cache"],
+        view_worker_state["points_cc"],
+        view_worker_state["visibility_engine"],
+    )
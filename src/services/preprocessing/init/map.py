@@ -12,22 +12,35 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import copy
+import numpy as np
 import open3d as o3d
 import zope.interface
 
 from src.services.preprocessing.common.interface import IProcessor
+from src.services.scan_cache import load_world_scan
 
 
 @zope.interface.implementer(IProcessor)
 class InitMapProcessor:
     def process(self, config, pcd=None, points2instances=None):
-        """Combining clouds from config.start_index to config.end_index into a dense map in the world coordinate system"""
+        """Combining clouds from config.start_index to config.end_index into a dense map in the world coordinate system
 
-        map_wc = o3d.geometry.PointCloud()
+        If config.scan_cache is given, the transformed clouds are taken from it,
+        so the clouds shared with the previous windows are not loaded again.
+        """
+
+        if config.scan_cache is not None:
+            scans = [
+                config.scan_cache.get(config.dataset, i)
+                for i in range(config.start_index, config.end_index)
+            ]
+        else:
+            scans = [
+                load_world_scan(config.dataset, i)
+                for i in range(config.start_index, config.end_index)
+            ]
 
-        for i in range(config.start_index, config.end_index):
-            T = config.dataset.get_lidar_pose(i)
-            map_wc += copy.deepcopy(config.dataset.get_point_cloud(i)).transform(T)
+        map_wc = o3d.geometry.PointCloud()
+        map_wc.points = o3d.utility.Vector3dVector(np.concatenate(scans))
 
         return map_wc
@@ -12,12 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import copy
 import numpy as np
-import numpy_indexed as npi
+import open3d as o3d
 import zope.interface
 
 from src.services.preprocessing.common.interface import IProcessor
+from src.utils.pcd_utils import voxel_down_sample_and_trace
+from src.utils.trace import Trace
 
 
 @zope.interface.implementer(IProcessor)
@@ -25,48 +26,67 @@ class VoxelDownProcessor:
     def process(self, config, pcd, points2instances):
         """Downsample input pcd with a voxel"""
 
-        return self.build_o3d_voxel_pcd(
-            pcd,
-            points2instances,
-            config.start_index,
-            config.end_index,
-            config.start_image_index_offset,
-            config.voxel_size,
-        )
+        return self.build_voxel_pcd(pcd, points2instances, config.voxel_size)
 
-    def build_o3d_voxel_pcd(
-        self, pcd, points2instances, start_index, end_index, image_offset, voxel_size
-    ):
-        """Open3d function voxel_down_sample_and_trace call.
+    def build_voxel_pcd(self, pcd, points2instances, voxel_size):
+        """Voxel downsampling of the cloud, the same as the open3d function voxel_down_sample_and_trace.
 
         Recalculation of the instance matrix for the voxel cloud. The voxel is assigned an instance
         corresponding to the most frequent instance result among the points that formed the voxel.
-        """
 
-        pcd_copy = copy.deepcopy(pcd)
-
-        min_bound = pcd_copy.get_min_bound()
-        max_bound = pcd_copy.get_max_bound()
+        The trace (see Trace) stores the indices of the points of the original cloud
+        that formed each voxel.
+        """
 
-        downpcd_trace = pcd_copy.voxel_down_sample_and_trace(
-            voxel_size, min_bound, max_bound, True
+        voxel_points, voxel_ids, trace_offsets, trace_indices = (
+            voxel_down_sample_and_trace(np.asarray(pcd.points), voxel_size)
         )
 
-        downpcd = downpcd_trace[0]
-        list_int_vectors = downpcd_trace[2]
+        downpcd = o3d.geometry.PointCloud()
+        downpcd.points = o3d.utility.Vector3dVector(voxel_points)
 
-        image_count = end_index - start_index + image_offset
-        upd_points2instances = np.zeros((len(list_int_vectors), image_count), dtype=int)
+        upd_points2instances = self.find_voxel_instances(
+            points2instances, voxel_ids, len(voxel_points)
+        )
+        return downpcd, upd_points2instances, Trace(trace_offsets, trace_indices)
 
-        for i in range(len(list_int_vectors)):
-            int_vector_array = np.asarray(list_int_vectors[i])
-            instances = []
-            for j in range(len(int_vector_array)):
-                instances.append(points2instances[int_vector_array[j]])
-            instances_array = np.asarray(instances)
+    def find_voxel_instances(self, points2instances, voxel_ids, voxel_count):
+        """The most frequent row of the instance matrix among the points of each voxel.
 
-            voxel_instance = npi.mode(instances_array)
+        Rows are compared as a whole, not column by column. Among equally frequent rows the one
+        that is the smallest by the bytes of its values is chosen, as numpy_indexed.mode does.
+        All voxels are processed at once: the (voxel, row) pairs are sorted and
+        the lengths of the runs of equal pairs are the numbers of occurrences of the rows.
+        """
 
-            upd_points2instances[i] = voxel_instance
+        points2instances = np.ascontiguousarray(points2instances)
+        rows = points2instances.view(
+            np.dtype(
+                (np.void, points2instances.dtype.itemsize * points2instances.shape[1])
+            )
+        ).reshape(-1)
+        _, row_ids = np.unique(rows, return_inverse=True)
+        row_ids = row_ids.reshape(-1)
+
+        order = np.lexsort((row_ids, voxel_ids))
+        pairs = np.stack([voxel_ids[order], row_ids[order]], axis=1)
+        run_starts = np.flatnonzero(np.any(np.diff(pairs, axis=0) != 0, axis=1)) + 1
+        run_starts = np.concatenate([[0], run_starts])
+        run_lengths = np.diff(np.concatenate([run_starts, [len(order)]]))
+
+        run_voxels = pairs[run_starts, 0]
+        run_rows = pairs[run_starts, 1]
+
+        # for each voxel, the longest run with the smallest row
+        best_runs = np.lexsort((run_rows, -run_lengths, run_voxels))
+        first_of_voxel = np.concatenate([[True], np.diff(run_voxels[best_runs]) != 0])
+        best_runs = best_runs[first_of_voxel]
+
+        upd_points2instances = np.zeros(
+            (voxel_count, points2instances.shape[1]), dtype=int
+        )
+        upd_points2instances[run_voxels[best_runs]] = points2instances[
+            order[run_starts[best_runs]]
+        ]
 
-        return downpcd, upd_points2instances, downpcd_trace[2]
+        return upd_points2instances
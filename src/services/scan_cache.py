@@ -0,0 +1,66 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+
+from collections import OrderedDict
+
+from src.utils.geometry_utils import transform_points
+
+
+class ScanCache:
+    """Ring buffer of the clouds of a dataset transformed to the world coordinate system.
+
+    Consecutive windows of a sequence overlap if their stride is less than their length,
+    the scans of the overlap are loaded and transformed only once. A cache serves one dataset,
+    the scans are addressed by their index and the least recently used scans are evicted.
+
+    Parameters
+    ----------
+    capacity : int
+        maximum number of scans kept in memory, usually the length of a window
+    """
+
+    def __init__(self, capacity=4):
+        self.capacity = capacity
+        self.scans = OrderedDict()
+
+    def __getstate__(self):
+        # the scans are not copied to worker processes
+        state = self.__dict__.copy()
+        state["scans"] = OrderedDict()
+        return state
+
+    def get(self, dataset, index):
+        """Points of the cloud index in the world coordinate system, the array is read-only"""
+
+        if index in self.scans:
+            self.scans.move_to_end(index)
+            return self.scans[index]
+
+        points = load_world_scan(dataset, index)
+        points.flags.writeable = False
+
+        self.scans[index] = points
+        while len(self.scans) > self.capacity:
+            self.scans.popitem(last=False)
+
+        return points
+
+
+def load_world_scan(dataset, index):
+    """Points of the cloud index in the world coordinate system"""
+
+    points = np.asarray(dataset.get_point_cloud(index).points)
+    return transform_points(points, dataset.get_lidar_pose(index))
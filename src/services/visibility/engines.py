@@ -0,0 +1,52 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from src.services.visibility.hidden_point_removal import (
+    HiddenPointRemovalVisibilityEngine,
+)
+from src.services.visibility.z_buffer import ZBufferVisibilityEngine
+
+VISIBILITY_ENGINES = {
+    "hpr": HiddenPointRemovalVisibilityEngine,
+    "z_buffer": ZBufferVisibilityEngine,
+}
+
+
+def build_visibility_engine(
+    name,
+    frustum_margin=None,
+    z_buffer_scale=0.5,
+    z_buffer_splat_size=0,
+    z_buffer_depth_tolerance=0.05,
+):
+    """Building a visibility engine of the instance matrix by its name in ConfigDTO
+
+    frustum_margin is only used by the hidden point removal, the depth buffer
+    considers the points projected into the image only. The z_buffer_* parameters
+    are the parameters of ZBufferVisibilityEngine
+    """
+
+    if name not in VISIBILITY_ENGINES:
+        raise ValueError(
+            "Unknown visibility engine {}, has to be in {}".format(
+                name, list(VISIBILITY_ENGINES)
+            )
+        )
+
+    if name == "hpr":
+        return HiddenPointRemovalVisibilityEngine(frustum_margin)
+
+    return ZBufferVisibilityEngine(
+        z_buffer_scale, z_buffer_splat_size, z_buffer_depth_tolerance
+    )
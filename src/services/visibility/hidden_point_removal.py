@@ -0,0 +1,49 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import open3d as o3d
+import zope.interface
+
+from src.services.visibility.interface import IVisibilityEngine
+from src.utils.pcd_utils import get_visible_points
+from src.utils.pcd_utils import get_visible_points_in_frustum
+
+
+@zope.interface.implementer(IVisibilityEngine)
+class HiddenPointRemovalVisibilityEngine:
+    def __init__(self, frustum_margin=None):
+        self.frustum_margin = frustum_margin
+        # without culling only the points projected into the image are needed
+        self.margin = frustum_margin if frustum_margin is not None else 0
+
+    def get_visible_points(self, points_cc, projection, img_shape):
+        """Hidden point removal of open3d (get_visible_points).
+
+        If frustum_margin is given, only the projected points (the points in the camera frustum
+        extended by frustum_margin pixels) are considered (get_visible_points_in_frustum).
+        """
+
+        indices, _, _ = projection
+
+        if self.frustum_margin is not None:
+            return get_visible_points_in_frustum(points_cc, indices)
+
+        pcd_cc = o3d.geometry.PointCloud()
+        pcd_cc.points = o3d.utility.Vector3dVector(points_cc)
+
+        visible = np.zeros(len(points_cc), dtype=bool)
+        visible[np.asarray(get_visible_points(pcd_cc), dtype=int)] = True
+
+        return visible[indices]
@@ -0,0 +1,32 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import zope.interface
+
+
+class IVisibilityEngine(zope.interface.Interface):
+    margin = zope.interface.Attribute(
+        "Margin in pixels of the image into which the points are projected for get_visible_points"
+    )
+
+    def get_visible_points(points_cc, projection, img_shape):
+        """Finding the points of the cloud that are not hidden from the camera by other points.
+
+        points_cc are the points in the camera coordinate system, projection is the result
+        of project_points_to_image for points_cc with the margin of the engine:
+        the indices of the projected points, their pixel coordinates and depths.
+        img_shape is the width and height of the image.
+
+        The result is the mask of the visible points among the projected points.
+        """
@@ -0,0 +1,70 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import zope.interface
+
+from src.services.visibility.interface import IVisibilityEngine
+
+
+@zope.interface.implementer(IVisibilityEngine)
+class ZBufferVisibilityEngine:
+    """Visibility by the depth buffer of the image.
+
+    Parameters
+    ----------
+    scale : float
+        scale of the depth buffer relative to the image, the buffer of a downscaled image
+        has fewer gaps between the projections of sparse points
+    splat_size : int
+        each point covers the square of (2 * splat_size + 1) pixels of the buffer around its projection
+    depth_tolerance : float
+        a point is visible if its depth exceeds the nearest depth of its pixel by at most
+        depth_tolerance of that depth
+    """
+
+    # only the points projected into the image can be visible
+    margin = 0
+
+    def __init__(self, scale=0.5, splat_size=0, depth_tolerance=0.05):
+        self.scale = scale
+        self.splat_size = splat_size
+        self.depth_tolerance = depth_tolerance
+
+    def get_visible_points(self, points_cc, projection, img_shape):
+        """The projected points are put into the buffer, the nearest depth is kept for each pixel."""
+
+        _, pixels, depths = projection
+
+        img_width, img_height = img_shape
+        buffer_width = int(np.ceil(img_width * self.scale))
+        buffer_height = int(np.ceil(img_height * self.scale))
+
+        u = np.minimum((pixels[:, 0] * self.scale).astype(int), buffer_width - 1)
+        v = np.minimum((pixels[:, 1] * self.scale).astype(int), buffer_height - 1)
+
+        z_buffer = np.full((buffer_height, buffer_width), np.inf)
+        offsets = range(-self.splat_size, self.splat_size + 1)
+        for dv in offsets:
+            for du in offsets:
+                np.minimum.at(
+                    z_buffer,
+                    (
+                        np.clip(v + dv, 0, buffer_height - 1),
+                        np.clip(u + du, 0, buffer_width - 1),
+                    ),
+                    depths,
+                )
+
+        return depths <= z_buffer[v, u] * (1 + self.depth_tolerance)
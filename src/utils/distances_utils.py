@@ -14,9 +14,21 @@
 
 import numpy as np
 
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+# The number of point pairs whose instances are compared at once.
+# Two arrays of chunk size by number of views are allocated at a time
+PAIRS_CHUNK_SIZE = 1 << 18
+
 
 def sam_label_distance(
-    sam_features, spatial_distance, proximity_threshold, beta, alpha
+    sam_features,
+    spatial_distance,
+    proximity_threshold,
+    beta,
+    alpha,
+    chunk_size=PAIRS_CHUNK_SIZE,
 ):
     """Calculating a matrix of distances between points based on preliminary labeling and physical distance between points.
 
@@ -32,28 +44,28 @@ def sam_label_distance(
         parameter to increase the spread of distance values in the final calculation (part with distance between instances)
     alpha : int
         parameter to increase the spread of distance values in the final calculation (part with physical distance)
+    chunk_size : int
+        number of point pairs processed at once, bounds the memory of the calculation
     """
 
-    mask = np.where(spatial_distance <= proximity_threshold)
+    close_points = spatial_distance <= proximity_threshold
 
     # Initialize the distance matrix with zeros
-    num_points, num_views = sam_features.shape
+    num_points = sam_features.shape[0]
     distance_matrix = np.zeros((num_points, num_points))
 
-    # Iterate over rows (points)
-    for point1, point2 in zip(*mask):
-        view_counter = 0
-        for view in range(num_views):
-            instance_id1 = sam_features[point1, view]
-            instance_id2 = sam_features[point2, view]
-
-            if instance_id1 != 0 and instance_id2 != 0:
-                view_counter += 1
-                if instance_id1 != instance_id2:
-                    distance_matrix[point1, point2] += 1
-        if view_counter:
-            distance_matrix[point1, point2] /= view_counter
-            distance_matrix[point2, point1] = distance_matrix[point1, point2]
+    # The diagonal elements are always zero, so only pairs of different points are calculated
+    point1, point2 = np.where(close_points)
+    not_diagonal = point1 != point2
+    point1, point2 = point1[not_diagonal], point2[not_diagonal]
+
+    distance_matrix[point1, point2] = instance_distance_by_pairs(
+        sam_features,
+        point1,
+        point2,
+        visited_twice=close_points[point2, point1],
+        chunk_size=chunk_size,
+    )
 
     mask = np.where(spatial_distance <= proximity_threshold, 1, 0)
     label_distance = (
@@ -63,21 +75,134 @@ def sam_label_distance(
     return label_distance, mask
 
 
-def dfs(distance_matrix, start_vertex):
-    num_vertices = len(distance_matrix)
-    visited = np.array([False for i in range(num_vertices)], dtype=bool)
-    stack = [start_vertex]
+def sam_label_distance_sparse(
+    sam_features,
+    points,
+    proximity_threshold,
+    beta,
+    alpha,
+    chunk_size=PAIRS_CHUNK_SIZE,
+):
+    """Sparse version of sam_label_distance.
+
+    Only pairs of points closer than proximity_threshold are found (using a KD-tree),
+    so neither the physical distance matrix nor the distance matrix between instances
+    is built densely. The result matches the result of sam_label_distance
+    for spatial_distance = cdist(points, points).
+
+    Parameters
+    ----------
+    sam_features : matrix
+        instance matrix
+    points : array
+        cloud points
+    proximity_threshold : int
+        threshold value of the distance between close points
+    beta : int
+        parameter to increase the spread of distance values in the final calculation (part with distance between instances)
+    alpha : int
+        parameter to increase the spread of distance values in the final calculation (part with physical distance)
+    chunk_size : int
+        number of point pairs processed at once, bounds the memory of the calculation
+
+    Returns
+    -------
+    label_distance : scipy.sparse.csr_matrix
+        distance matrix, zeros are not stored
+    mask : scipy.sparse.csr_matrix
+        adjacency matrix of close points
+    """
+
+    num_points = len(points)
+
+    pairs = cKDTree(points).query_pairs(proximity_threshold, output_type="ndarray")
+    point1, point2 = pairs[:, 0], pairs[:, 1]
+
+    spatial_distance = np.linalg.norm(points[point1] - points[point2], axis=1)
+    instance_distance = instance_distance_by_pairs(
+        sam_features, point1, point2, visited_twice=True, chunk_size=chunk_size
+    )
+
+    diagonal = np.arange(num_points)
+    rows = np.concatenate((point1, point2, diagonal))
+    cols = np.concatenate((point2, point1, diagonal))
+
+    pair_distance = np.exp(-beta * instance_distance) * np.exp(
+        -alpha * spatial_distance
+    )
+    data = np.concatenate((pair_distance, pair_distance, np.ones(num_points)))
+
+    label_distance = sparse.csr_matrix(
+        (data, (rows, cols)), shape=(num_points, num_points)
+    )
+    label_distance.eliminate_zeros()
+
+    mask = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=int), (rows, cols)), shape=(num_points, num_points)
+    )
+
+    return label_distance, mask
+
+
+def instance_distance_by_pairs(
+    sam_features, point1, point2, visited_twice, chunk_size=PAIRS_CHUNK_SIZE
+):
+    """Calculating the distance between instances of point pairs (point1[i], point2[i]), point1[i] != point2[i].
+
+    The distance is the share of views on which both points are labeled, but with different instances.
+
+    The value matches the one calculated by the original pairwise loop of sam_label_distance,
+    where a pair of close points is visited once as (i, j) and, if (j, i) is also close, a second time.
+    The second visit adds its disagreeing views one by one to the value of the first visit
+    and divides the sum by the number of views again, so this is reproduced here exactly.
+
+    Parameters
+    ----------
+    sam_features : matrix
+        instance matrix
+    point1, point2 : array
+        indices of the points of each pair
+    visited_twice : array or bool
+        true for the pairs that the pairwise loop visits in both directions
+    chunk_size : int
+        number of point pairs processed at once
+    """
+
+    view_counter, different_views = count_views_by_pairs(
+        sam_features, point1, point2, chunk_size
+    )
+
+    covisible = view_counter > 0
+    distance = different_views.astype(float)
+    distance[covisible] /= view_counter[covisible]
+
+    second_visit = covisible & visited_twice
+    for view in range(different_views.max(initial=0)):
+        distance[second_visit & (different_views > view)] += 1
+    distance[second_visit] /= view_counter[second_visit]
+
+    return distance
+
+
+def count_views_by_pairs(sam_features, point1, point2, chunk_size=PAIRS_CHUNK_SIZE):
+    """Counting for each pair of points the number of views on which both points are labeled (view counter)
+    and the number of such views on which the points have different instances.
+
+    Pairs are processed in chunks of chunk_size so that the memory does not depend on the number of pairs.
+    """
+
+    num_pairs = len(point1)
+    view_counter = np.zeros(num_pairs, dtype=int)
+    different_views = np.zeros(num_pairs, dtype=int)
+
+    for start in range(0, num_pairs, chunk_size):
+        end = min(start + chunk_size, num_pairs)
 
-    while stack:
-        current_vertex = stack.pop()
-        if not visited[current_vertex]:
-            visited[current_vertex] = True
+        instances1 = sam_features[point1[start:end]]
+        instances2 = sam_features[point2[start:end]]
 
-            for neighbor in range(num_vertices):
-                if (
-                    distance_matrix[current_vertex][neighbor] > 0
-                    and not visited[neighbor]
-                ):
-                    stack.append(neighbor)
+        labeled = (instances1 != 0) & (instances2 != 0)
+        view_counter[start:end] = labeled.sum(axis=1)
+        different_views[start:end] = (labeled & (instances1 != instances2)).sum(axis=1)
 
-    return visited
+    return view_counter, different_views
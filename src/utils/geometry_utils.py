@@ -13,6 +13,9 @@
 # limitations under the License.
 
 
+import numpy as np
+
+
 def find_intersection(bbox1, bbox2):
     x1_bbox1, y1_bbox1, w_bbox1, h_bbox1 = bbox1
     x1_bbox2, y1_bbox2, w_bbox2, h_bbox2 = bbox2
@@ -59,3 +62,16 @@ def calculate_area(bbox):
     w = bbox[2]
     h = bbox[3]
     return w * h
+
+
+def transform_points(points, T, out=None):
+    """Applying the 4x4 transformation T to the (N, 3) points
+
+    The points are multiplied by the rotation in one matmul. If out is given,
+    the result is written into it, so one buffer can be reused for many transformations.
+    """
+
+    points = np.asarray(points)
+    out = np.matmul(points, T[:3, :3].T.astype(points.dtype), out=out)
+    out += T[:3, 3].astype(points.dtype)
+    return out
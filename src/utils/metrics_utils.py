@@ -0,0 +1,220 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+
+from src.utils.trace import Trace
+
+
+def calculate_clusters_in_gt_instance(inst_label_array, clusters, trace):
+    """Percentage of the voxels of each cluster that contain points of GT instances
+
+    Parameters
+    ----------
+    inst_label_array : array
+        GT instance of each point of the original cloud, 0 if the point is not in an instance
+    clusters : Trace or list of arrays
+        voxel numbers of each cluster
+    trace : Trace
+        original points of each voxel
+    """
+
+    if not isinstance(clusters, Trace):
+        clusters = Trace.from_int_vectors(clusters)
+
+    voxel_ids = np.repeat(np.arange(len(trace)), trace.lengths)
+    voxels_in_gt_instance = (
+        np.bincount(
+            voxel_ids,
+            weights=np.asarray(inst_label_array)[trace.indices] > 0,
+            minlength=len(trace),
+        )
+        > 0
+    )
+
+    cluster_ids = np.repeat(np.arange(len(clusters)), clusters.lengths)
+    voxels_in_gt_instance_count = np.bincount(
+        cluster_ids,
+        weights=voxels_in_gt_instance[clusters.indices],
+        minlength=len(clusters),
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (voxels_in_gt_instance_count / clusters.lengths) * 100
+
+
+def build_pred_inst_array(
+    inst_label_array_for_clustering, clusters, trace, instance_threshold
+):
+    """Predicted instance of each point of the original cloud
+
+    The clusters in which at least instance_threshold percent of voxels contain points
+    of GT instances are numbered from 1 in their order, the points of the other clusters are 0.
+
+    Parameters
+    ----------
+    inst_label_array_for_clustering : array
+        GT instance of each point of the original cloud, 0 if the point is not in an instance
+    clusters : Trace or list of arrays
+        voxel numbers of each cluster
+    trace : Trace
+        original points of each voxel
+    instance_threshold : float
+        minimum percentage of the voxels of a cluster in GT instances
+    """
+
+    if not isinstance(clusters, Trace):
+        clusters = Trace.from_int_vectors(clusters)
+
+    clusters_in_gt_instance = calculate_clusters_in_gt_instance(
+        inst_label_array_for_clustering, clusters, trace
+    )
+    selected_clusters = clusters_in_gt_instance >= instance_threshold
+    cluster_pred_ids = np.where(selected_clusters, np.cumsum(selected_clusters), 0)
+
+    voxels = clusters.indices
+    voxel_pred_ids = np.repeat(cluster_pred_ids, clusters.lengths)
+    selected_voxels = voxel_pred_ids > 0
+
+    voxels_trace = trace.subset(voxels[selected_voxels])
+    pred_inst_array = np.zeros(len(inst_label_array_for_clustering), dtype=int)
+    pred_inst_array[voxels_trace.indices] = np.repeat(
+        voxel_pred_ids[selected_voxels], voxels_trace.lengths
+    )
+
+    return pred_inst_array
+
+
+def build_cluster_array(clusters, trace, points_count):
+    """Number of the cluster (from 1) of each point of the original cloud, 0 if the point is not in a cluster"""
+
+    if not isinstance(clusters, Trace):
+        clusters = Trace.from_int_vectors(clusters)
+
+    voxels_trace = trace.subset(clusters.indices)
+    voxel_cluster_ids = np.repeat(np.arange(1, len(clusters) + 1), clusters.lengths)
+
+    cluster_array = np.zeros(points_count, dtype=int)
+    cluster_array[voxels_trace.indices] = np.repeat(
+        voxel_cluster_ids, voxels_trace.lengths
+    )
+
+    return cluster_array
+
+
+def calculate_iou_table(pred_labels, gt_labels):
+    """IoU of every pair of predicted and GT instances that intersect, label 0 is not an instance
+
+    Returns the predicted labels, the GT labels and the IoU of the pairs
+    """
+
+    pred_labels = np.asarray(pred_labels)
+    gt_labels = np.asarray(gt_labels)
+
+    pred_sizes = np.bincount(pred_labels)
+    gt_sizes = np.bincount(gt_labels)
+
+    both_labeled = (pred_labels > 0) & (gt_labels > 0)
+    pairs, intersections = np.unique(
+        np.stack([pred_labels[both_labeled], gt_labels[both_labeled]], axis=1),
+        axis=0,
+        return_counts=True,
+    )
+    pair_pred_labels, pair_gt_labels = pairs[:, 0], pairs[:, 1]
+
+    unions = pred_sizes[pair_pred_labels] + gt_sizes[pair_gt_labels] - intersections
+
+    return pair_pred_labels, pair_gt_labels, intersections / unions
+
+
+def calculate_metrics_by_thresholds(
+    inst_label_array_for_clustering,
+    clusters,
+    trace,
+    instance_thresholds,
+    iou_threshold=0.75,
+):
+    """Precision, recall and F-score of the predicted instances for all instance thresholds at once
+
+    The predicted instances for a threshold are the clusters of build_pred_inst_array.
+    The clusters do not intersect, so the IoU of a cluster with a GT instance does not depend
+    on the other selected clusters, and the IoU table of all clusters is calculated once.
+    A GT instance and a predicted instance are matched if their IoU is at least iou_threshold,
+    as the "iou" condition of evops.metrics. Since the threshold is greater than 0.5, an instance
+    has at most one match, so the number of true positives is the number of matched pairs.
+
+    Parameters
+    ----------
+    inst_label_array_for_clustering : array
+        GT instance of each point of the original cloud, 0 if the point is not in an instance
+    clusters : Trace or list of arrays
+        voxel numbers of each cluster
+    trace : Trace
+        original points of each voxel
+    instance_thresholds : list of float
+        minimum percentages of the voxels of a cluster in GT instances
+    iou_threshold : float
+        minimum IoU of matched instances
+
+    Returns
+    -------
+    metrics : dict of arrays
+        "precision", "recall", "fScore", "gt_instances" and "pred_instances"
+        (the numbers of instances) for each threshold
+    """
+
+    if not isinstance(clusters, Trace):
+        clusters = Trace.from_int_vectors(clusters)
+
+    gt_labels = np.asarray(inst_label_array_for_clustering)
+    cluster_array = build_cluster_array(clusters, trace, len(gt_labels))
+
+    pair_clusters, _, ious = calculate_iou_table(cluster_array, gt_labels)
+    matched_clusters = pair_clusters[ious >= iou_threshold] - 1
+
+    clusters_in_gt_instance = calculate_clusters_in_gt_instance(
+        gt_labels, clusters, trace
+    )
+    clusters_with_points = (
+        np.bincount(cluster_array, minlength=len(clusters) + 1)[1:] > 0
+    )
+
+    # selected clusters of each threshold
+    selected_clusters = (
+        np.asarray(instance_thresholds, dtype=float)[:, None]
+        <= clusters_in_gt_instance[None, :]
+    )
+
+    true_positive = selected_clusters[:, matched_clusters].sum(axis=1)
+    pred_instances = (selected_clusters & clusters_with_points).sum(axis=1)
+    gt_instances = np.full(
+        len(instance_thresholds), len(np.unique(gt_labels[gt_labels > 0]))
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(pred_instances > 0, true_positive / pred_instances, 0.0)
+        recall = np.where(gt_instances > 0, true_positive / gt_instances, 0.0)
+        fScore = np.where(
+            precision + recall > 0,
+            2 * precision * recall / (precision + recall),
+            0.0,
+        )
+
+    return {
+        "precision": precision,
+        "recall": recall,
+        "fScore": fScore,
+        "gt_instances": gt_instances,
+        "pred_instances": pred_instances,
+    }
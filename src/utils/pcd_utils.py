@@ -30,11 +30,55 @@ def get_subpcd(pcd, indices):
 
 
 def remove_statistical_outlier_points(pcd, nb_neighbors=25, std_ratio=5.0):
-    pcd_copy = copy.deepcopy(pcd)
-    pcd_result, indices = pcd_copy.remove_statistical_outlier(nb_neighbors, std_ratio)
+    # the cloud is not changed, the result is a new cloud
+    pcd_result, indices = pcd.remove_statistical_outlier(nb_neighbors, std_ratio)
     return pcd_result, indices
 
 
+def voxel_down_sample_and_trace(points, voxel_size):
+    """Vectorized equivalent of open3d voxel_down_sample_and_trace for the points of a cloud
+
+    The voxel grid starts at the min bound of the points as in open3d. The voxel of a point
+    is its integer coordinates in the grid, packed into one integer key. The point of a voxel
+    is the mean of its points, summed in the order of the points as in open3d.
+    The voxels are ordered by their keys.
+
+    Returns
+    -------
+    voxel_points : array
+        points of the voxel cloud
+    voxel_ids : array
+        number of the voxel of each point of the original cloud
+    trace_offsets, trace_indices : arrays
+        trace in CSR form, the indices of the points of the original cloud that formed the i-th voxel
+        are trace_indices[trace_offsets[i] : trace_offsets[i + 1]] in increasing order
+    """
+
+    points = np.asarray(points)
+    coords = np.floor((points - points.min(axis=0)) / voxel_size).astype(np.int64)
+
+    dims = coords.max(axis=0) + 1
+    keys = (coords[:, 0] * dims[1] + coords[:, 1]) * dims[2] + coords[:, 2]
+    _, voxel_ids, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    voxel_ids = voxel_ids.reshape(-1)
+
+    voxel_points = (
+        np.stack(
+            [
+                np.bincount(voxel_ids, weights=points[:, axis], minlength=len(counts))
+                for axis in range(3)
+            ],
+            axis=1,
+        )
+        / counts[:, None]
+    )
+
+    trace_indices = np.argsort(voxel_ids, kind="stable")
+    trace_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    return voxel_points, voxel_ids, trace_offsets, trace_indices
+
+
 def build_map_wc_triangle_mesh(
     dataset, cam_name, start_index, end_index, visualize=False
 ):
@@ -44,7 +88,7 @@ def build_map_wc_triangle_mesh(
     for i in range(start_index, end_index):
         T = dataset.get_lidar_pose(i)
         # Shift the cloud to the world coordinate system
-        map_wc += copy.deepcopy(dataset.get_point_cloud(i)).transform(T)
+        map_wc += dataset.get_point_cloud(i).transform(T)
 
         m = o3d.geometry.TriangleMesh.create_coordinate_frame()
         # Camera position in the world coordinate system
@@ -58,7 +102,7 @@ def build_map_wc_triangle_mesh(
     return map_wc, geometries
 
 
-def get_visible_points(pcd_centered, visualize=False):
+def get_visible_points(pcd_centered, visualize=False, diameter=None):
     """Removing hidden points
 
     Parameters
@@ -68,12 +112,16 @@ def get_visible_points(pcd_centered, visualize=False):
     visualize : boolean
         true, if visualization of the result is required.
         false, otherwise
+    diameter : float
+        diameter of the cloud that defines the radius of the spherical flipping,
+        the diameter of pcd_centered if None
     """
 
-    diameter = np.linalg.norm(
-        np.asarray(pcd_centered.get_max_bound())
-        - np.asarray(pcd_centered.get_min_bound())
-    )
+    if diameter is None:
+        diameter = np.linalg.norm(
+            np.asarray(pcd_centered.get_max_bound())
+            - np.asarray(pcd_centered.get_min_bound())
+        )
 
     # In this algorithm, the pcd is considered in the camera coordinate system,
     # so the camera position is defined as the origin of coordinates
@@ -90,6 +138,159 @@ def get_visible_points(pcd_centered, visualize=False):
     return indices_visible
 
 
+def project_points_to_image(points_cc, cam_intrinsics, img_shape, margin=0):
+    """Projecting the points in front of the camera into the image extended by margin pixels on each side
+
+    Parameters
+    ----------
+    points_cc : array
+        points in the camera coordinate system
+    cam_intrinsics : matrix
+        3x3 camera matrix
+    img_shape : tuple
+        width and height of the image
+    margin : float
+        the points projected at most margin pixels outside the image are kept
+
+    Returns
+    -------
+    indices : array
+        indices of the projected points in points_cc
+    pixels : array
+        (x, y) coordinates of the projections of these points, not rounded
+    depths : array
+        depths of these points
+    """
+
+    in_front_indices = np.flatnonzero(points_cc[:, 2] > 0)
+    points_proj = points_cc[in_front_indices] @ np.asarray(cam_intrinsics).T
+    depths = points_proj[:, 2]
+    pixels = points_proj[:, :2] / depths[:, None]
+
+    in_frustum = is_in_image(pixels, img_shape, margin)
+
+    return in_front_indices[in_frustum], pixels[in_frustum], depths[in_frustum]
+
+
+def project_points_to_views(
+    points, T_views, cam_intrinsics, img_shapes, margin=0, chunk_size=65536, out=None
+):
+    """Projecting the points into the images of V views at once
+
+    The points are moved to the coordinate systems of all cameras and projected by stacked matmuls
+    over chunks of chunk_size points, so the temporary arrays do not grow with the number of points.
+    The projection of each view is the same as project_points_to_image, but it is given by masks
+    over all points instead of the indices of the projected points.
+
+    Parameters
+    ----------
+    points : array
+        (N, 3) points in the world coordinate system
+    T_views : array
+        (V, 4, 4) transformations from the world coordinate system to the coordinate systems of the cameras
+    cam_intrinsics : array
+        (V, 3, 3) camera matrices of the views or one 3x3 camera matrix of all views
+    img_shapes : array
+        (V, 2) widths and heights of the images of the views
+    margin : float
+        the points projected at most margin pixels outside the image are kept
+    chunk_size : int
+        number of points projected at once
+    out : array
+        (V, N, 3) buffer of the points in the coordinate systems of the cameras, allocated if None
+
+    Returns
+    -------
+    points_cc : array
+        (V, N, 3) points in the coordinate systems of the cameras
+    pixels : array
+        (V, N, 2) (x, y) coordinates of the projections of the points, not rounded
+    depths : array
+        (V, N) depths of the points
+    in_frustum : array
+        (V, N) mask of the points in front of the camera projected into the image extended by margin
+    """
+
+    points = np.asarray(points)
+    T_views = np.asarray(T_views, dtype=points.dtype)
+    views_count, points_count = T_views.shape[0], points.shape[0]
+
+    cam_intrinsics = np.broadcast_to(
+        np.asarray(cam_intrinsics, dtype=points.dtype), (views_count, 3, 3)
+    )
+    img_shapes = np.asarray(img_shapes).reshape(views_count, 2)
+
+    if out is None:
+        out = np.empty((views_count, points_count, 3), dtype=points.dtype)
+    pixels = np.empty((views_count, points_count, 2), dtype=points.dtype)
+    depths = np.empty((views_count, points_count), dtype=points.dtype)
+    in_frustum = np.empty((views_count, points_count), dtype=bool)
+
+    R_T = T_views[:, :3, :3].transpose(0, 2, 1)
+    t = T_views[:, None, :3, 3]
+    K_T = cam_intrinsics.transpose(0, 2, 1)
+    for start in range(0, points_count, chunk_size):
+        end = min(start + chunk_size, points_count)
+
+        points_cc = out[:, start:end]
+        np.matmul(points[start:end], R_T, out=points_cc)
+        points_cc += t
+
+        points_proj = np.matmul(points_cc, K_T)
+        depths[:, start:end] = points_proj[:, :, 2]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.divide(
+                points_proj[:, :, :2],
+                points_proj[:, :, 2:],
+                out=pixels[:, start:end],
+            )
+
+        for view in range(views_count):
+            in_frustum[view, start:end] = (points_cc[view, :, 2] > 0) & is_in_image(
+                pixels[view, start:end], img_shapes[view], margin
+            )
+
+    return out, pixels, depths, in_frustum
+
+
+def is_in_image(pixels, img_shape, margin=0):
+    """Mask of the (x, y) pixel coordinates inside the image extended by margin pixels on each side"""
+
+    img_width, img_height = img_shape
+
+    return (
+        (pixels[:, 0] >= -margin)
+        & (pixels[:, 0] < img_width + margin)
+        & (pixels[:, 1] >= -margin)
+        & (pixels[:, 1] < img_height + margin)
+    )
+
+
+def get_visible_points_in_frustum(points_cc, frustum_indices):
+    """Removing hidden points among the points of the camera frustum (see project_points_to_image)
+
+    The points outside the frustum are never projected into the image, so they are discarded
+    before the removal of hidden points, whose cost grows with the number of points.
+    The margin of the frustum keeps the points near the borders of the image that can hide the points inside it.
+    The radius of the spherical flipping is defined by the diameter of all points as without culling.
+    Returns the mask of the visible points among frustum_indices.
+    """
+
+    visible = np.zeros(len(frustum_indices), dtype=bool)
+    if len(frustum_indices) < 4:
+        # the hull of fewer points is degenerate, nothing can be hidden
+        visible[:] = True
+        return visible
+
+    pcd_frustum = o3d.geometry.PointCloud()
+    pcd_frustum.points = o3d.utility.Vector3dVector(points_cc[frustum_indices])
+
+    diameter = np.linalg.norm(points_cc.max(axis=0) - points_cc.min(axis=0))
+    visible[np.asarray(get_visible_points(pcd_frustum, diameter=diameter))] = True
+
+    return visible
+
+
 def color_pcd_by_two_groups(points, indices):
     """Cloud coloring by group of given indices and remaining indices at points
 
@@ -145,7 +346,7 @@ def color_pcd_by_clusters_and_voxels(pcd, trace, clusters):
     ----------
     pcd : open3d.geometry.PointCloud
         cloud for coloring
-    trace : list of IntVectors
+    trace : Trace
         the i-th element stores the indices of the points of the original cloud that formed the i-th voxel
     clusters : list of lists
         the i-th element stores the indices of the points of the voxel cloud that fell into the i-th cluster
@@ -153,15 +354,17 @@ def color_pcd_by_clusters_and_voxels(pcd, trace, clusters):
 
     random_colors = generate_random_colors(len(clusters) + 1)
     pcd_colored = copy.deepcopy(pcd)
-    pcd_colored.colors = o3d.utility.Vector3dVector(
-        np.zeros(np.asarray(pcd.points).shape)
-    )
 
-    for i in range(len(clusters)):
-        cluster = clusters[i]
-        for voxel in cluster:
-            src_points = trace[voxel]
-            for point in src_points:
-                pcd_colored.colors[point] = random_colors[i + 1]
+    voxel_labels = np.zeros(len(trace), dtype=int)
+    for i, cluster in enumerate(clusters):
+        voxel_labels[np.asarray(cluster, dtype=int)] = i + 1
+
+    colors = np.zeros(np.asarray(pcd.points).shape)
+    labeled_voxels = np.flatnonzero(voxel_labels)
+    labeled_trace = trace.subset(labeled_voxels)
+    colors[labeled_trace.indices] = random_colors[
+        np.repeat(voxel_labels[labeled_voxels], labeled_trace.lengths)
+    ]
+    pcd_colored.colors = o3d.utility.Vector3dVector(colors)
 
     return pcd_colored
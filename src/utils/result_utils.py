@@ -0,0 +1,116 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import numpy as np
+
+from pathlib import Path
+
+from src.utils.trace import Trace
+
+RESULT_FORMAT = "lidar-labelling-result"
+RESULT_FORMAT_VERSION = 1
+
+
+def save_result(path, arrays, traces=None, attributes=None):
+    """Saving the result of a window as a directory of named arrays
+
+    Every array is stored in <name>.npy, every trace (or list of index arrays, e.g. clusters)
+    is stored as the CSR pair <name>.offsets.npy and <name>.indices.npy. meta.json with
+    the format version, the names of the arrays and the attributes is written last,
+    so a directory without meta.json is incomplete.
+
+    Parameters
+    ----------
+    path : str or Path
+        directory of the result, it is created
+    arrays : dict
+        arrays by their names
+    traces : dict
+        Traces or lists of index arrays by their names
+    attributes : dict
+        JSON serializable values stored in meta.json, e.g. the parameters of the run
+    """
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    meta = {
+        "format": RESULT_FORMAT,
+        "version": RESULT_FORMAT_VERSION,
+        "arrays": {},
+        "traces": {},
+        "attributes": attributes or {},
+    }
+
+    for name, array in arrays.items():
+        array = np.asarray(array)
+        np.save(path.joinpath("{}.npy".format(name)), array)
+        meta["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape)}
+
+    for name, trace in (traces or {}).items():
+        if not isinstance(trace, Trace):
+            trace = Trace.from_int_vectors(trace)
+        np.save(path.joinpath("{}.offsets.npy".format(name)), trace.offsets)
+        np.save(path.joinpath("{}.indices.npy".format(name)), trace.indices)
+        meta["traces"][name] = {"length": len(trace)}
+
+    with open(path.joinpath("meta.json"), "w") as file:
+        json.dump(meta, file, indent=2)
+
+
+def load_result_meta(path):
+    """The contents of meta.json of the result, ValueError if it is not a result of a known version"""
+
+    with open(Path(path).joinpath("meta.json")) as file:
+        meta = json.load(file)
+
+    if meta.get("format") != RESULT_FORMAT:
+        raise ValueError("{} is not a result directory".format(path))
+    if meta.get("version") != RESULT_FORMAT_VERSION:
+        raise ValueError(
+            "Unsupported version {} of the result {}".format(meta.get("version"), path)
+        )
+
+    return meta
+
+
+def load_result_array(path, name, mmap_mode="r"):
+    """The array of the result, by default it is memory-mapped and only the used parts are read"""
+
+    return np.load(Path(path).joinpath("{}.npy".format(name)), mmap_mode=mmap_mode)
+
+
+def load_result_trace(path, name, mmap_mode="r"):
+    """The trace (or the clusters) of the result"""
+
+    return Trace(
+        load_result_array(path, "{}.offsets".format(name), mmap_mode),
+        load_result_array(path, "{}.indices".format(name), mmap_mode),
+    )
+
+
+def is_valid_result(path):
+    """Checking that the result is complete: meta.json is readable and all arrays are in place"""
+
+    try:
+        meta = load_result_meta(path)
+    except (OSError, ValueError):
+        return False
+
+    file_names = ["{}.npy".format(name) for name in meta["arrays"]]
+    for name in meta["traces"]:
+        file_names += ["{}.offsets.npy".format(name), "{}.indices.npy".format(name)]
+
+    return all(Path(path).joinpath(file_name).is_file() for file_name in file_names)
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import copy
+import numpy as np
 
 from src.utils.geometry_utils import find_intersection
 from src.utils.geometry_utils import find_union
@@ -25,20 +26,148 @@ def find_intersection_mask(mask1, mask2):
     segmentation = mask1["segmentation"] * mask2["segmentation"]
     area = segmentation.sum()
 
-    intersection_mask = copy.deepcopy(mask1)
+    intersection_mask = copy_mask_without_segmentation(mask1)
     intersection_mask["segmentation"] = segmentation
     intersection_mask["bbox"] = bbox
     intersection_mask["area"] = area
     return intersection_mask
 
 
+def find_intersection_area(mask1, mask2):
+    """The number of pixels in the intersection of masks and the intersection of their boxes.
+
+    The pixels of a mask lie inside its box (including the right and bottom borders),
+    so only the crop of the intersection of the boxes is compared.
+    """
+
+    bbox = find_intersection(mask1["bbox"], mask2["bbox"])
+    if bbox == None:
+        return None, None
+
+    area = np.logical_and(
+        get_crop(mask1["segmentation"], bbox), get_crop(mask2["segmentation"], bbox)
+    ).sum()
+
+    return area, bbox
+
+
 def find_union_mask(mask1, mask2):
     segmentation = mask1["segmentation"] + mask2["segmentation"]
     bbox = find_union(mask1["bbox"], mask2["bbox"])
     area = segmentation.sum()
 
-    union_mask = copy.deepcopy(mask1)
+    union_mask = copy_mask_without_segmentation(mask1)
     union_mask["segmentation"] = segmentation
     union_mask["bbox"] = bbox
     union_mask["area"] = area
     return union_mask
+
+
+def copy_mask_without_segmentation(mask):
+    """Deep copy of the mask except the segmentation, which is replaced by the caller anyway"""
+
+    return copy.deepcopy(
+        {key: value for key, value in mask.items() if key != "segmentation"}
+    )
+
+
+def masks_to_compact(masks, image_shape=None):
+    """Packing the masks of an image into flat arrays that are saved without pickle.
+
+    The segmentation of each mask is cropped to the box of its pixels and packed into bits,
+    the crops of all masks are concatenated into "crops" and separated by "offsets".
+    The boxes of the crops are stored in "crop_bboxes" (xywh, including the right and bottom borders),
+    the original boxes and areas of the masks in "bboxes" and "areas".
+    The other values of the masks are stored as arrays of the same name stacked over the masks:
+    scalars (e.g. "predicted_iou") as 1D arrays, lists (e.g. "point_coords", "crop_box")
+    as arrays with the shape of the list after the first axis.
+    The shape of the image is taken from the masks, it is required if there are no masks.
+    """
+
+    if image_shape is None:
+        if len(masks) == 0:
+            raise ValueError("The shape of an image without masks is required")
+        image_shape = masks[0]["segmentation"].shape
+
+    crops = []
+    crop_bboxes = np.zeros((len(masks), 4), dtype=np.int32)
+    for i, mask in enumerate(masks):
+        rows = np.flatnonzero(mask["segmentation"].any(axis=1))
+        columns = np.flatnonzero(mask["segmentation"].any(axis=0))
+        if len(rows) > 0:
+            crop_bboxes[i] = [
+                columns[0],
+                rows[0],
+                columns[-1] - columns[0],
+                rows[-1] - rows[0],
+            ]
+            crops.append(np.packbits(get_crop(mask["segmentation"], crop_bboxes[i])))
+        else:
+            crop_bboxes[i] = [0, 0, -1, -1]
+            crops.append(np.zeros(0, dtype=np.uint8))
+
+    compact = {
+        "image_shape": np.array(image_shape, dtype=np.int64),
+        "bboxes": np.array([mask["bbox"] for mask in masks]).reshape(-1, 4),
+        "areas": np.array([mask["area"] for mask in masks], dtype=np.int64),
+        "crop_bboxes": crop_bboxes,
+        "offsets": np.cumsum([0] + [len(crop) for crop in crops], dtype=np.int64),
+        "crops": np.concatenate(crops) if crops else np.zeros(0, dtype=np.uint8),
+    }
+
+    for key in masks[0].keys() if len(masks) > 0 else []:
+        if key in ["segmentation", "bbox", "area"]:
+            continue
+        values = [np.asarray(mask[key]) for mask in masks]
+        if any(value.shape != values[0].shape for value in values):
+            raise ValueError(
+                "The values of {} have different shapes in the masks".format(key)
+            )
+        compact[key] = np.stack(values)
+
+    return compact
+
+
+def compact_to_masks(compact):
+    """Unpacking the masks of an image from the arrays built by masks_to_compact"""
+
+    # the arrays of a npz file are read once
+    compact = {key: compact[key] for key in compact.keys()}
+
+    image_shape = tuple(compact["image_shape"])
+    value_keys = [
+        key
+        for key in compact.keys()
+        if key
+        not in ["image_shape", "bboxes", "areas", "crop_bboxes", "offsets", "crops"]
+    ]
+
+    masks = []
+    for i in range(len(compact["areas"])):
+        x, y, w, h = compact["crop_bboxes"][i]
+        segmentation = np.zeros(image_shape, dtype=bool)
+        crop_size = (h + 1) * (w + 1)
+        if crop_size > 0:
+            packed = compact["crops"][compact["offsets"][i] : compact["offsets"][i + 1]]
+            segmentation[y : y + h + 1, x : x + w + 1] = np.unpackbits(
+                packed, count=crop_size
+            ).reshape(h + 1, w + 1)
+
+        mask = {
+            "segmentation": segmentation,
+            "bbox": compact["bboxes"][i].tolist(),
+            "area": int(compact["areas"][i]),
+        }
+        for key in value_keys:
+            # the lists are restored as lists, as SAM gives them
+            mask[key] = compact[key][i].tolist()
+        masks.append(mask)
+
+    return masks
+
+
+def get_crop(segmentation, bbox):
+    """Part of the segmentation inside the box including its right and bottom borders"""
+
+    x, y, w, h = [int(value) for value in bbox]
+    return segmentation[y : y + h + 1, x : x + w + 1]
@@ -0,0 +1,104 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+
+
+class Trace:
+    """Correspondence of the points of a downsampled cloud to the points of the original cloud.
+
+    The indices of the original points that formed the i-th point are
+    indices[offsets[i] : offsets[i + 1]], the same as the rows of a CSR matrix.
+
+    Parameters
+    ----------
+    offsets : array
+        len(trace) + 1 increasing offsets into indices, offsets[0] is 0
+    indices : array
+        indices of the points of the original cloud
+    """
+
+    def __init__(self, offsets, indices):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+
+    @classmethod
+    def from_int_vectors(cls, int_vectors):
+        """Trace from a list of open3d IntVectors (or any sequences of indices)"""
+
+        arrays = [np.asarray(int_vector, dtype=np.int64) for int_vector in int_vectors]
+        lengths = [len(array) for array in arrays]
+        indices = np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int64)
+
+        return cls(np.concatenate([[0], np.cumsum(lengths)]), indices)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as trace_file:
+            return cls(trace_file["offsets"], trace_file["indices"])
+
+    def save(self, path):
+        np.savez(path, offsets=self.offsets, indices=self.indices)
+
+    @property
+    def lengths(self):
+        """Number of the original points of each point"""
+
+        return np.diff(self.offsets)
+
+    def subset(self, selection):
+        """Trace of the selected points, selection is a boolean mask or an array of point numbers"""
+
+        selection = np.asarray(selection)
+        if selection.dtype == bool:
+            selection = np.flatnonzero(selection)
+
+        starts = self.offsets[selection]
+        lengths = self.offsets[selection + 1] - starts
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+        # position of each selected index in self.indices
+        positions = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], lengths)
+
+        return Trace(offsets, self.indices[positions])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            if item < 0:
+                item += len(self)
+            if not 0 <= item < len(self):
+                raise IndexError("trace index out of range")
+            return self.indices[self.offsets[item] : self.offsets[item + 1]]
+
+        if isinstance(item, slice):
+            item = np.arange(len(self))[item]
+
+        return self.subset(item)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.indices[self.offsets[i] : self.offsets[i + 1]]
+
+    def __eq__(self, other):
+        if not isinstance(other, Trace):
+            return NotImplemented
+        return np.array_equal(self.offsets, other.offsets) and np.array_equal(
+            self.indices, other.indices
+        )
+
+    def __repr__(self):
+        return "Trace(points={}, indices={})".format(len(self), len(self.indices))
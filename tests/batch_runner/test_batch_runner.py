@@ -0,0 +1,92 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import pytest
+
+from pathlib import Path
+
+from src.services.batch_runner import BatchRunner
+
+
+def process_window(window):
+    start_index, end_index = window
+    if start_index == 2:
+        raise ValueError("window {} can not be processed".format(window))
+    return start_index + end_index
+
+
+def save_result(result, path):
+    Path(path).write_text(str(result))
+
+
+def is_valid_output(path):
+    try:
+        return Path(path).read_text().isdigit()
+    except FileNotFoundError:
+        return False
+
+
+def get_output_path(output_dir, window):
+    return str(Path(output_dir).joinpath("start{}_end{}.txt".format(*window)))
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_batch_runner(num_workers, tmp_path):
+    windows = [(start_index, start_index + 2) for start_index in range(5)]
+    output_path = functools.partial(get_output_path, tmp_path)
+    Path(output_path(windows[0])).write_text("100")  # a valid output of a previous run
+    Path(output_path(windows[1])).write_text("")  # an interrupted write
+    # temporary outputs of killed workers
+    Path(output_path(windows[3]) + ".tmp12345").write_text("7")
+    Path(output_path(windows[0]) + ".tmp678").mkdir()
+
+    runner = BatchRunner(
+        process_window,
+        save_result,
+        is_valid_output,
+        output_path,
+        tmp_path.joinpath("manifest.json"),
+        num_workers,
+    )
+    manifest = runner.run(windows)
+
+    statuses = [
+        manifest["windows"][output_path(window)]["status"] for window in windows
+    ]
+    assert statuses == ["skipped", "done", "failed", "done", "done"]
+    assert "ValueError" in manifest["windows"][output_path(windows[2])]["error"]
+    assert all(
+        manifest["windows"][output_path(window)].keys()
+        == manifest["windows"][output_path(windows[1])].keys()
+        for window in windows
+    )
+    assert Path(output_path(windows[0])).read_text() == "100"
+    assert Path(output_path(windows[1])).read_text() == "4"
+    assert not Path(output_path(windows[2])).exists()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "manifest.json",
+        "start0_end2.txt",
+        "start1_end3.txt",
+        "start3_end5.txt",
+        "start4_end6.txt",
+    ]
+
+    # the records of the finished windows are kept when the run is resumed
+    manifest = runner.run(windows)
+
+    statuses = [
+        manifest["windows"][output_path(window)]["status"] for window in windows
+    ]
+    assert statuses == ["skipped", "done", "failed", "done", "done"]
@@ -16,9 +16,13 @@ import numpy as np
 import pytest
 import open3d as o3d
 
+from scipy import sparse
+
 from src.services.distance.connected_component import (
+    ExtractionConnectedComponentsProcessor,
     ExtractionLargestConnectedComponentProcessor,
 )
+from src.utils.trace import Trace
 
 
 @pytest.mark.parametrize(
@@ -54,16 +58,18 @@ from src.services.distance.connected_component import (
                     [0.9, 0.9, 0.9],
                 ]
             ),
-            [
-                o3d.utility.IntVector([1000, 7891, 452]),
-                o3d.utility.IntVector([33]),
-                o3d.utility.IntVector([224, 4565]),
-                o3d.utility.IntVector([14, 8905]),
-                o3d.utility.IntVector([5, 6, 7, 8]),
-                o3d.utility.IntVector([88, 99, 96]),
-                o3d.utility.IntVector([4, 5, 6, 7, 8, 9, 99, 8, 56]),
-                o3d.utility.IntVector([12]),
-            ],
+            Trace.from_int_vectors(
+                [
+                    o3d.utility.IntVector([1000, 7891, 452]),
+                    o3d.utility.IntVector([33]),
+                    o3d.utility.IntVector([224, 4565]),
+                    o3d.utility.IntVector([14, 8905]),
+                    o3d.utility.IntVector([5, 6, 7, 8]),
+                    o3d.utility.IntVector([88, 99, 96]),
+                    o3d.utility.IntVector([4, 5, 6, 7, 8, 9, 99, 8, 56]),
+                    o3d.utility.IntVector([12]),
+                ]
+            ),
             np.array(
                 [
                     [1.0, 0.5, 0.6, 0.0, 0.0],
@@ -82,13 +88,15 @@ from src.services.distance.connected_component import (
                     [0.9, 0.9, 0.9],
                 ]
             ),
-            [
-                o3d.utility.IntVector([14, 8905]),
-                o3d.utility.IntVector([5, 6, 7, 8]),
-                o3d.utility.IntVector([88, 99, 96]),
-                o3d.utility.IntVector([4, 5, 6, 7, 8, 9, 99, 8, 56]),
-                o3d.utility.IntVector([12]),
-            ],
+            Trace.from_int_vectors(
+                [
+                    o3d.utility.IntVector([14, 8905]),
+                    o3d.utility.IntVector([5, 6, 7, 8]),
+                    o3d.utility.IntVector([88, 99, 96]),
+                    o3d.utility.IntVector([4, 5, 6, 7, 8, 9, 99, 8, 56]),
+                    o3d.utility.IntVector([12]),
+                ]
+            ),
         )
     ],
 )
@@ -107,3 +115,28 @@ def test_extract_largest_connected_component(
     assert (actual_dist == expected_dist).all()
     assert (actual_points == expected_points).all()
     assert actual_trace == expected_trace
+
+
+@pytest.mark.parametrize(
+    "components_count, min_component_size, expected_components",
+    [
+        (None, 1, [1, 1, 1, 0, 0, 0, 0, 2, 2, 2, 3]),
+        (2, 1, [1, 1, 1, 0, 0, 0, 0, -1, -1, -1, -1]),
+        (None, 3, [1, 1, 1, 0, 0, 0, 0, 2, 2, 2, -1]),
+        (1, 3, [-1, -1, -1, 0, 0, 0, 0, -1, -1, -1, -1]),
+        (None, 5, [-1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1]),
+    ],
+)
+def test_find_connected_components(
+    components_count, min_component_size, expected_components
+):
+    edges = np.array([[0, 1], [2, 1], [3, 4], [4, 5], [6, 3], [7, 9], [8, 9]])
+    dist = sparse.coo_matrix(
+        (np.full(len(edges), 0.5), (edges[:, 0], edges[:, 1])), shape=(11, 11)
+    )
+
+    processor = ExtractionConnectedComponentsProcessor(
+        components_count, min_component_size
+    )
+
+    assert (processor.find_components(dist) == expected_components).all()
@@ -16,7 +16,10 @@ import numpy as np
 import pytest
 import open3d as o3d
 
+from scipy import sparse
+
 from src.services.distance.isolated import RemovingIsolatedPointsProcessor
+from src.utils.trace import Trace
 
 
 @pytest.mark.parametrize(
@@ -52,16 +55,18 @@ from src.services.distance.isolated import RemovingIsolatedPointsProcessor
                     [0.9, 0.9, 0.9],
                 ]
             ),
-            [
-                o3d.utility.IntVector([1000, 7891, 452]),
-                o3d.utility.IntVector([33]),
-                o3d.utility.IntVector([224, 4565]),
-                o3d.utility.IntVector([14, 8905]),
-                o3d.utility.IntVector([5, 6, 7, 8]),
-                o3d.utility.IntVector([88, 99, 96]),
-                o3d.utility.IntVector([4, 5, 6, 7, 8, 9, 99, 8, 56]),
-                o3d.utility.IntVector([12]),
-            ],
+            Trace.from_int_vectors(
+                [
+                    o3d.utility.IntVector([1000, 7891, 452]),
+                    o3d.utility.IntVector([33]),
+                    o3d.utility.IntVector([224, 4565]),
+                    o3d.utility.IntVector([14, 8905]),
+                    o3d.utility.IntVector([5, 6, 7, 8]),
+                    o3d.utility.IntVector([88, 99, 96]),
+                    o3d.utility.IntVector([4, 5, 6, 7, 8, 9, 99, 8, 56]),
+                    o3d.utility.IntVector([12]),
+                ]
+            ),
             np.array(
                 [
                     [1.0, 0.2, 0.3, 0.4],
@@ -78,12 +83,14 @@ from src.services.distance.isolated import RemovingIsolatedPointsProcessor
                     [0.5, 0.6, 0.7],
                 ]
             ),
-            [
-                o3d.utility.IntVector([1000, 7891, 452]),
-                o3d.utility.IntVector([33]),
-                o3d.utility.IntVector([14, 8905]),
-                o3d.utility.IntVector([88, 99, 96]),
-            ],
+            Trace.from_int_vectors(
+                [
+                    o3d.utility.IntVector([1000, 7891, 452]),
+                    o3d.utility.IntVector([33]),
+                    o3d.utility.IntVector([14, 8905]),
+                    o3d.utility.IntVector([88, 99, 96]),
+                ]
+            ),
         )
     ],
 )
@@ -102,3 +109,14 @@ def test_remove_isolated_points(
     assert (actual_dist == expected_dist).all()
     assert (actual_points == expected_points).all()
     assert actual_trace == expected_trace
+
+    actual_sparse_dist, actual_points, actual_trace = (
+        RemovingIsolatedPointsProcessor().process(
+            sparse.csr_matrix(dist), points, trace
+        )
+    )
+
+    assert sparse.issparse(actual_sparse_dist)
+    assert (actual_sparse_dist.toarray() == expected_dist).all()
+    assert (actual_points == expected_points).all()
+    assert actual_trace == expected_trace
@@ -0,0 +1,82 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from src.services.evaluation import aggregate_metrics
+from src.services.evaluation import evaluate_windows
+from src.services.evaluation import load_evaluation
+from src.services.evaluation import save_evaluation
+from src.utils.trace import Trace
+
+
+def load_window(window):
+    """Window with two clusters, the first one matches the GT instance if start_index is even,
+    there are no GT instances if start_index is divisible by 3"""
+
+    _, start_index, _ = window
+    trace = Trace.from_int_vectors([[0, 1], [2], [3]])
+    clusters = [np.array([0]), np.array([1, 2])]
+    inst_label_array = np.array([1, 1, 0, 0])
+    if start_index % 2 == 1:
+        inst_label_array = np.array([1, 0, 0, 0])
+    if start_index % 3 == 0:
+        inst_label_array = np.zeros(4, dtype=int)
+    return clusters, trace, inst_label_array
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_evaluate_windows(num_workers, tmp_path):
+    windows = [("00", start_index, start_index + 4) for start_index in range(6)] + [
+        ("01", 2, 6)
+    ]
+
+    columns = evaluate_windows(windows, load_window, [0, 50], num_workers, 2)
+    save_evaluation(tmp_path.joinpath("metrics.npz"), columns)
+    columns = load_evaluation(tmp_path.joinpath("metrics.npz"))
+
+    assert columns["sequence"].tolist() == ["00"] * 8 + ["01"] * 2
+    assert columns["start_index"].tolist() == [1, 1, 2, 2, 4, 4, 5, 5, 2, 2]
+    assert columns["instance_threshold"].tolist() == [0, 50] * 5
+    assert columns["precision"].tolist() == [0, 0, 0.5, 1, 0.5, 1, 0, 0, 0.5, 1]
+    assert columns["recall"].tolist() == [0, 0, 1, 1, 1, 1, 0, 0, 1, 1]
+    assert columns["pred_instances"].tolist() == [2, 1, 2, 1, 2, 1, 2, 1, 2, 1]
+    assert columns["clusters"].tolist() == [2] * 10
+
+
+def test_aggregate_metrics():
+    columns = {
+        "sequence": np.array(["01", "00", "00", "01", "00"]),
+        "instance_threshold": np.array([30.0, 50.0, 30.0, 30.0, 30.0]),
+        "precision": np.array([1.0, 0.5, 0.0, 0.0, 1.0]),
+        "recall": np.array([1.0, 1.0, 1.0, 0.5, 0.5]),
+        "fScore": np.array([1.0, 0.5, 0.0, 0.0, 0.5]),
+    }
+
+    aggregates = aggregate_metrics(columns)
+
+    assert aggregates["sequence"].tolist() == ["00", "00", "01"]
+    assert aggregates["instance_threshold"].tolist() == [30.0, 50.0, 30.0]
+    assert aggregates["windows"].tolist() == [2, 1, 2]
+    assert aggregates["precision_mean"].tolist() == [0.5, 0.5, 0.5]
+    assert aggregates["precision_ones"].tolist() == [0.5, 0.0, 0.5]
+    assert aggregates["precision_zeros"].tolist() == [0.5, 0.0, 0.5]
+    assert aggregates["recall_mean"].tolist() == [0.75, 1.0, 0.75]
+
+    total = aggregate_metrics(columns, group_by=())
+
+    assert total["windows"].tolist() == [5]
+    assert total["fScore_mean"].tolist() == [0.4]
+    assert total["recall_ones"].tolist() == [0.6]
@@ -0,0 +1,90 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import numpy as np
+import pytest
+
+from scipy import sparse
+
+from src.services.normalized_cut_service import get_min_ncut
+from src.services.normalized_cut_service import ncut_cost
+from src.services.normalized_cut_service import ncut_costs_by_thresholds
+
+distance_matrix = np.array(
+    [
+        [1.0, 0.2, 0.3, 0.0, 0.0, 0.0, 0.0, 0.0],
+        [0.2, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+        [0.3, 0.0, 1.0, 0.1, 0.0, 0.0, 0.0, 0.0],
+        [0.0, 0.0, 0.1, 1.0, 0.5, 0.6, 0.0, 0.0],
+        [0.0, 0.0, 0.0, 0.5, 1.0, 0.0, 0.7, 0.0],
+        [0.0, 0.0, 0.0, 0.6, 0.0, 1.0, 0.0, 0.0],
+        [0.0, 0.0, 0.0, 0.0, 0.7, 0.0, 1.0, 0.8],
+        [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.8, 1.0],
+    ]
+)
+
+
+@pytest.mark.parametrize(
+    "w, " "ev",
+    [
+        (
+            distance_matrix,
+            np.array([0.9, 0.8, 0.8, -0.1, -0.5, -0.2, -0.7, -0.9]),
+        ),
+        (
+            sparse.csr_matrix(distance_matrix),
+            np.array([-0.3, 0.4, 0.2, 0.2, 0.1, -0.6, 0.5, -0.1]),
+        ),
+    ],
+)
+def test_ncut_costs_by_thresholds(w, ev):
+    """All cuts at once give the same costs as the cuts calculated one by one"""
+
+    W = w + sparse.identity(w.shape[0])
+    D = sparse.diags(np.array(W.sum(axis=0))[0])
+
+    thresholds = np.linspace(ev.min(), ev.max(), 25, endpoint=False)
+
+    actual_costs = ncut_costs_by_thresholds(ev, D, w, thresholds)
+    expected_costs = np.array([ncut_cost(w, D, ev > t) for t in thresholds])
+
+    assert np.allclose(actual_costs, expected_costs)
+
+
+def test_ncut_costs_by_thresholds_empty_cut():
+    """The cost of an empty or a full first part is infinite"""
+
+    W = distance_matrix + sparse.identity(distance_matrix.shape[0])
+    D = sparse.diags(np.array(W.sum(axis=0))[0])
+    ev = np.array([0.9, 0.8, 0.8, -0.1, -0.5, -0.2, -0.7, -0.9])
+
+    costs = ncut_costs_by_thresholds(ev, D, distance_matrix, np.array([-1.0, 1.0]))
+
+    assert np.all(costs == np.inf)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_get_min_ncut_nan_eigenvector(seed):
+    """An eigenvector of NaN gives no cut"""
+
+    rng = np.random.default_rng(seed)
+    w = rng.uniform(0.0, 1.0, (49, 49))
+    w = sparse.csr_matrix(w + w.T)
+    D = sparse.diags(np.array((w + sparse.identity(49)).sum(axis=0))[0])
+
+    mask, mcut = get_min_ncut(np.full(49, np.nan), D, w, 10)
+
+    assert not np.any(mask)
+    assert mcut == np.inf
@@ -0,0 +1,228 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import numpy as np
+import pytest
+
+from scipy import sparse
+
+from src.services.eigen.lobpcg import AmgLobpcgEigenSolver
+from src.services.eigen.lobpcg import LobpcgEigenSolver
+from src.services.eigen.shift_invert import ShiftInvertEigenSolver
+from src.services.normalized_cut_service import get_min_ncut
+from src.services.normalized_cut_service import normalized_cut
+
+block_sizes = [6, 5, 7]
+block_labels = np.repeat(np.arange(len(block_sizes)), block_sizes)
+
+rng = np.random.default_rng(0)
+weights = rng.uniform(0.5, 1.0, (len(block_labels), len(block_labels)))
+same_block = block_labels[:, None] == block_labels[None, :]
+distance_matrix = np.where(same_block, weights + weights.T, 0.01 * weights * weights.T)
+np.fill_diagonal(distance_matrix, 0.0)
+
+
+@pytest.mark.parametrize(
+    "w, " "num_workers, " "pool",
+    [
+        (distance_matrix, 1, "thread"),
+        (sparse.csr_matrix(distance_matrix), 1, "thread"),
+        (sparse.csr_matrix(distance_matrix), 3, "thread"),
+        (sparse.csr_matrix(distance_matrix), 2, "process"),
+    ],
+)
+def test_normalized_cut(w, num_workers, pool):
+    """Weakly connected blocks of the graph are the clusters"""
+
+    labels = np.arange(w.shape[0]) + 100
+
+    clusters = normalized_cut(w, labels, 0.2, num_workers=num_workers, pool=pool)
+
+    actual_clusters = sorted(sorted(cluster.tolist()) for cluster in clusters)
+    expected_clusters = sorted(
+        (np.flatnonzero(block_labels == block) + 100).tolist()
+        for block in range(len(block_sizes))
+    )
+
+    assert actual_clusters == expected_clusters
+
+
+@pytest.mark.parametrize(
+    "eigen_solver, " "warm_start",
+    [
+        (ShiftInvertEigenSolver(), True),
+        (LobpcgEigenSolver(), False),
+        (LobpcgEigenSolver(), True),
+        (AmgLobpcgEigenSolver(), False),
+        (AmgLobpcgEigenSolver(), True),
+    ],
+)
+def test_normalized_cut_eigen_solvers(eigen_solver, warm_start):
+    """All eigen solvers find the weakly connected blocks of the graph"""
+
+    w = sparse.csr_matrix(distance_matrix)
+
+    clusters = normalized_cut(
+        w,
+        np.arange(w.shape[0]),
+        0.2,
+        eigen_solver=eigen_solver,
+        warm_start=warm_start,
+    )
+
+    actual_clusters = sorted(sorted(cluster.tolist()) for cluster in clusters)
+    expected_clusters = sorted(
+        np.flatnonzero(block_labels == block).tolist()
+        for block in range(len(block_sizes))
+    )
+
+    assert actual_clusters == expected_clusters
+
+
+class RecordingEigenSolver(ShiftInvertEigenSolver):
+    def __init__(self):
+        super().__init__()
+        self.start_vectors = []
+
+    def solve(self, A, eigenvalues_count, v0):
+        self.start_vectors.append(v0)
+        return super().solve(A, eigenvalues_count, v0)
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_normalized_cut_warm_start(num_workers):
+    """Each part of a divided partition starts from the Fiedler vector of the partition"""
+
+    eigen_solver = RecordingEigenSolver()
+
+    normalized_cut(
+        sparse.csr_matrix(distance_matrix),
+        np.arange(len(block_labels)),
+        0.2,
+        num_workers=num_workers,
+        eigen_solver=eigen_solver,
+        warm_start=True,
+    )
+
+    assert len(eigen_solver.start_vectors) > 1
+    assert eigen_solver.start_vectors[0] is None
+    assert all(v0 is not None for v0 in eigen_solver.start_vectors[1:])
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_normalized_cut_components(num_workers):
+    """Components are divided independently, the labels of skipped components are dropped"""
+
+    w = sparse.block_diag([distance_matrix, distance_matrix, distance_matrix]).tocsr()
+    components = np.repeat([1, -1, 0], len(block_labels))
+
+    clusters = normalized_cut(
+        w, np.arange(w.shape[0]), 0.2, num_workers=num_workers, components=components
+    )
+
+    actual_clusters = [sorted(cluster.tolist()) for cluster in clusters]
+    expected_clusters = [
+        (np.flatnonzero(block_labels == block) + offset).tolist()
+        for offset in [2 * len(block_labels), 0]
+        for block in range(len(block_sizes))
+    ]
+
+    assert sorted(actual_clusters[:3]) == expected_clusters[:3]
+    assert sorted(actual_clusters[3:]) == expected_clusters[3:]
+
+
+class SeededEigenSolver(ShiftInvertEigenSolver):
+    """The initial vector of each eigenproblem depends only on its size"""
+
+    def solve(self, A, eigenvalues_count, v0):
+        if v0 is None:
+            v0 = np.random.default_rng(A.shape[0]).uniform(-1.0, 1.0, A.shape[0])
+        return super().solve(A, eigenvalues_count, v0)
+
+
+def recursive_normalized_cut(w, labels, T, eigen_solver):
+    """The recursive division that normalized_cut replaces"""
+
+    W = w + sparse.identity(w.shape[0])
+
+    if W.shape[0] <= 2:
+        return [labels]
+
+    d = np.array(W.sum(axis=0))[0]
+    D = sparse.diags(d)
+    D2 = sparse.diags(np.reciprocal(d))
+
+    A = D2 * (D - W) * D2
+
+    eigvals, eigvecs = eigen_solver.solve(A, 2, None)
+    ev = eigvecs[:, np.argsort(eigvals)[1]]
+
+    mask, mcut = get_min_ncut(ev, D, w, 10)
+
+    if mcut >= T:
+        return [labels]
+
+    return recursive_normalized_cut(
+        w[mask][:, mask], labels[mask], T, eigen_solver
+    ) + recursive_normalized_cut(w[~mask][:, ~mask], labels[~mask], T, eigen_solver)
+
+
+graph_rng = np.random.default_rng(1)
+graph_points = graph_rng.uniform(0.0, 5.0, (120, 3))
+graph_instances = graph_rng.integers(0, 6, (120, 4))
+graph_spatial_distance = np.linalg.norm(
+    graph_points[:, None] - graph_points[None, :], axis=2
+)
+graph_distance_matrix = (
+    (graph_spatial_distance <= 3)
+    * np.exp(-np.mean(graph_instances[:, None] != graph_instances[None, :], axis=2))
+    * np.exp(-graph_spatial_distance)
+)
+
+
+@pytest.mark.parametrize(
+    "w",
+    [graph_distance_matrix, sparse.csr_matrix(graph_distance_matrix)],
+)
+def test_normalized_cut_as_recursive(w):
+    """The serial division gives the same clusters in the same order as the recursive division"""
+
+    labels = np.arange(w.shape[0])
+
+    clusters = normalized_cut(w, labels, 0.3, eigen_solver=SeededEigenSolver())
+    expected_clusters = recursive_normalized_cut(w, labels, 0.3, SeededEigenSolver())
+
+    assert len(clusters) > len(block_sizes)
+    assert [cluster.tolist() for cluster in clusters] == [
+        cluster.tolist() for cluster in expected_clusters
+    ]
+
+
+@pytest.mark.parametrize("v0", [None, np.ones(4)])
+def test_shift_invert_singular_factor(v0):
+    """The factorization of the matrix of a complete graph is exactly singular,
+    the solver retries with a shift below zero"""
+
+    w = sparse.csr_matrix(np.ones((4, 4)) - np.eye(4))
+    W = w + sparse.identity(4)
+    d = np.array(W.sum(axis=0))[0]
+    D = sparse.diags(d)
+    D2 = sparse.diags(np.reciprocal(d))
+    A = D2 * (D - W) * D2
+
+    eigvals, eigvecs = ShiftInvertEigenSolver().solve(A, 2, v0)
+
+    assert np.allclose(np.sort(eigvals), [0.0, 0.25])
+    assert np.allclose(A @ eigvecs, eigvecs * eigvals)
@@ -12,13 +12,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import attr
+import numpy as np
 import open3d as o3d
 import pytest
 
+from types import SimpleNamespace
+
+from src.datasets.kitti_dataset import KittiDataset
+from src.services.label_image_cache import LabelImageCache
 from src.services.preprocessing.init.instances_matrix import (
     InitInstancesMatrixProcessor,
 )
 
+from src.services.visibility.z_buffer import ZBufferVisibilityEngine
+from src.utils.pcd_utils import project_points_to_image
+
 from tests.test_data import config
 from tests.utils import generate_init_pcd
 
@@ -32,3 +41,229 @@ def test_init_map(init_pcd: o3d.geometry.PointCloud):
     )
 
     assert points2instances.shape == (len(init_pcd.points), expected_image_count)
+
+
+@pytest.mark.parametrize(
+    "init_pcd", [generate_init_pcd(config).voxel_down_sample(voxel_size=1.0)]
+)
+def test_init_map_in_parallel(init_pcd: o3d.geometry.PointCloud):
+    """Processing images by a pool of processes gives the same matrix as the sequential one"""
+
+    points2instances = InitInstancesMatrixProcessor().process(config, init_pcd)
+    points2instances_parallel = InitInstancesMatrixProcessor().process(
+        attr.evolve(config, num_workers=2), init_pcd
+    )
+
+    assert np.array_equal(points2instances_parallel, points2instances)
+
+
+@pytest.mark.parametrize(
+    "init_pcd", [generate_init_pcd(config).voxel_down_sample(voxel_size=1.0)]
+)
+def test_init_map_in_parallel_float32(init_pcd: o3d.geometry.PointCloud):
+    """The workers read the shared points with the type of the map"""
+
+    map_wc = SimpleNamespace(points=np.asarray(init_pcd.points, dtype=np.float32))
+    matrix_args = (
+        map_wc,
+        config.dataset,
+        config.cam_name,
+        config.start_index - config.start_image_index_offset,
+        config.end_index,
+        config.reduce_detail_int_to_union_threshold,
+        config.reduce_detail_int_to_mask_threshold,
+    )
+    engine = ZBufferVisibilityEngine()
+
+    points2instances = InitInstancesMatrixProcessor().build_points2instances_matrix(
+        *matrix_args, num_workers=1, visibility_engine=engine
+    )
+    points2instances_parallel = (
+        InitInstancesMatrixProcessor().build_points2instances_matrix(
+            *matrix_args, num_workers=2, visibility_engine=engine
+        )
+    )
+
+    assert points2instances.any()
+    assert np.array_equal(points2instances_parallel, points2instances)
+
+
+@pytest.mark.parametrize(
+    "init_pcd", [generate_init_pcd(config).voxel_down_sample(voxel_size=1.0)]
+)
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_init_map_with_several_cameras(init_pcd: o3d.geometry.PointCloud, num_workers):
+    """The matrix has the columns of all images of each camera, the columns of the first camera go first"""
+
+    points2instances = InitInstancesMatrixProcessor().process(config, init_pcd)
+    points2instances_cams = InitInstancesMatrixProcessor().process(
+        attr.evolve(config, cam_names=["cam2", "cam2"], num_workers=num_workers),
+        init_pcd,
+    )
+
+    assert np.array_equal(
+        points2instances_cams, np.hstack([points2instances, points2instances])
+    )
+
+
+class SameMasksKittiDataset(KittiDataset):
+    """The images of all cameras have the masks of the images of cam2"""
+
+    def get_image_instances(self, cam_name, index):
+        return super().get_image_instances("cam2", index)
+
+    def get_image_instances_id(self, cam_name, index):
+        return super().get_image_instances_id("cam2", index)
+
+
+@pytest.mark.parametrize(
+    "init_pcd", [generate_init_pcd(config).voxel_down_sample(voxel_size=1.0)]
+)
+def test_init_map_with_different_cameras(init_pcd: o3d.geometry.PointCloud):
+    """Each camera of the batch of a view has its own extrinsics and intrinsics"""
+
+    dataset = SameMasksKittiDataset(
+        config.dataset.dataset_path,
+        config.dataset.sequence,
+        config.dataset.image_instances_path,
+    )
+    cams_config = attr.evolve(config, dataset=dataset)
+
+    points2instances_cams = InitInstancesMatrixProcessor().process(
+        attr.evolve(cams_config, cam_names=["cam2", "cam3"]), init_pcd
+    )
+    points2instances_cam2 = InitInstancesMatrixProcessor().process(
+        attr.evolve(cams_config, cam_name="cam2"), init_pcd
+    )
+    points2instances_cam3 = InitInstancesMatrixProcessor().process(
+        attr.evolve(cams_config, cam_name="cam3"), init_pcd
+    )
+
+    assert not np.array_equal(points2instances_cam2, points2instances_cam3)
+    assert np.array_equal(
+        points2instances_cams, np.hstack([points2instances_cam2, points2instances_cam3])
+    )
+
+
+class NoMasksKittiDataset(KittiDataset):
+    """The image of view 4 has no masks"""
+
+    def get_image_instances(self, cam_name, index):
+        if index == 4:
+            return []
+        return super().get_image_instances(cam_name, index)
+
+
+@pytest.mark.parametrize(
+    "init_pcd", [generate_init_pcd(config).voxel_down_sample(voxel_size=1.0)]
+)
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_init_map_with_image_without_masks(
+    init_pcd: o3d.geometry.PointCloud, num_workers, tmp_path
+):
+    """The points seen in an image without masks get no instances from it"""
+
+    dataset = NoMasksKittiDataset(
+        config.dataset.dataset_path,
+        config.dataset.sequence,
+        config.dataset.image_instances_path,
+    )
+    start_image_index = config.start_index - config.start_image_index_offset
+    matrix_args = (
+        init_pcd,
+        dataset,
+        config.cam_name,
+        start_image_index,
+        config.end_index,
+        config.reduce_detail_int_to_union_threshold,
+        config.reduce_detail_int_to_mask_threshold,
+    )
+
+    points2instances = InitInstancesMatrixProcessor().build_points2instances_matrix(
+        *matrix_args,
+        num_workers=num_workers,
+        label_image_cache=LabelImageCache(tmp_path),
+    )
+    points2instances_with_masks = InitInstancesMatrixProcessor().process(
+        config, init_pcd
+    )
+
+    column = 4 - start_image_index
+    assert not points2instances[:, column].any()
+    assert np.array_equal(
+        np.delete(points2instances, column, axis=1),
+        np.delete(points2instances_with_masks, column, axis=1),
+    )
+
+
+@pytest.mark.parametrize(
+    "init_pcd", [generate_init_pcd(config).voxel_down_sample(voxel_size=0.5)]
+)
+def test_init_map_with_frustum_culling(init_pcd: o3d.geometry.PointCloud):
+    """The points outside the frustum do not change the visibility of the points inside it"""
+
+    points2instances = InitInstancesMatrixProcessor().process(config, init_pcd)
+    points2instances_culled = InitInstancesMatrixProcessor().process(
+        attr.evolve(config, frustum_margin=50.0), init_pcd
+    )
+
+    assert np.array_equal(points2instances_culled, points2instances)
+
+
+@pytest.mark.parametrize(
+    "margin, " "expected_indices",
+    [(0, [0, 2, 4]), (5, [0, 1, 2, 4]), (100, [0, 1, 2, 4, 5])],
+)
+def test_project_points_to_image(margin, expected_indices):
+    points = np.array(
+        [
+            [0.5, 0.5, 1.0],
+            [-0.5, 0.5, 1.0],
+            [1.0, 0.5, 2.0],
+            [0.5, 0.5, -1.0],
+            [2.0, 1.5, 2.0],
+            [10.0, 0.5, 1.0],
+        ]
+    )
+    cam_intrinsics = np.array([[10.0, 0.0, 1.0], [0.0, 10.0, 0.5], [0.0, 0.0, 1.0]])
+
+    indices, pixels, depths = project_points_to_image(
+        points, cam_intrinsics, (12, 10), margin
+    )
+
+    assert indices.tolist() == expected_indices
+    assert np.allclose(pixels[:, 0], points[indices, 0] / points[indices, 2] * 10 + 1)
+    assert np.allclose(pixels[:, 1], points[indices, 1] / points[indices, 2] * 10 + 0.5)
+    assert np.array_equal(depths, points[indices, 2])
+
+
+def test_project_points_to_image_without_margin():
+    """With zero margin exactly the points in front of the camera projected into the image are kept"""
+
+    rng = np.random.default_rng(0)
+    # the pixel coordinates of the points are integers, including the borders of the image
+    pixels = rng.integers(-3, 15, (200, 2)).astype(float)
+    depths = rng.choice([-1.0, 1.0, 2.0], 200)
+    cam_intrinsics = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    points = np.hstack([pixels * depths[:, None], depths[:, None]])
+
+    indices, _, _ = project_points_to_image(points, cam_intrinsics, (12, 10), 0)
+
+    expected_indices = np.flatnonzero(
+        (depths > 0)
+        & (pixels[:, 0] >= 0)
+        & (pixels[:, 0] < 12)
+        & (pixels[:, 1] >= 0)
+        & (pixels[:, 1] < 10)
+    )
+    assert indices.tolist() == expected_indices.tolist()
+
+
+@pytest.mark.parametrize("frustum_margin", [-1.0, -0.5])
+def test_negative_frustum_margin(frustum_margin):
+    with pytest.raises(ValueError, match="non-negative"):
+        attr.evolve(config, frustum_margin=frustum_margin)
+
+
+def test_zero_frustum_margin():
+    assert attr.evolve(config, frustum_margin=0).frustum_margin == 0
@@ -12,7 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import attr
+import numpy as np
+
 from src.services.preprocessing.init.map import InitMapProcessor
+from src.services.scan_cache import ScanCache
 
 from tests.test_data import config
 
@@ -26,3 +30,24 @@ def test_init_map():
     )
 
     assert len(init_pcd.points) == expected_init_map_size
+
+
+def test_init_map_with_scan_cache():
+    """Overlapping windows reuse the cached clouds and build the same maps"""
+
+    scan_cache = ScanCache(capacity=4)
+    for start_index in [2, 3]:
+        window_config = attr.evolve(
+            config, start_index=start_index, end_index=start_index + 4
+        )
+        init_pcd = InitMapProcessor().process(window_config)
+        cached_init_pcd = InitMapProcessor().process(
+            attr.evolve(window_config, scan_cache=scan_cache)
+        )
+
+        assert np.array_equal(
+            np.asarray(cached_init_pcd.points), np.asarray(init_pcd.points)
+        )
+
+    assert list(scan_cache.scans) == [3, 4, 5, 6]
+    assert scan_cache.get(config.dataset, 3) is scan_cache.scans[3]
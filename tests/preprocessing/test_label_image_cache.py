@@ -0,0 +1,104 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import attr
+import numpy as np
+import open3d as o3d
+import pytest
+
+from src.services.label_image_cache import LabelImageCache
+from src.services.preprocessing.init.instances_matrix import (
+    InitInstancesMatrixProcessor,
+)
+
+from tests.test_data import config
+from tests.utils import generate_init_pcd
+
+
+def test_label_image_cache(tmp_path):
+    image_labels = np.arange(12, dtype=float).reshape(3, 4)
+
+    cache = LabelImageCache(tmp_path, memory_size=1)
+    keys = [cache.build_key("masks", "cam2", index, 0.5, 0.6) for index in range(3)]
+
+    cache.put(keys[0], image_labels)
+    # two files fit on disk
+    cache.disk_size = 2 * cache.get_path(keys[0]).stat().st_size
+    cache.get_path(keys[0]).unlink()
+    cache.memory.clear()
+
+    assert len(set(keys)) == 3
+    assert keys[0] != cache.build_key("masks", "cam2", 0, 0.5, 0.7)
+    assert cache.get(keys[0]) is None
+
+    for index, key in enumerate(keys):
+        cache.put(key, image_labels + index)
+
+    # only the last image is in memory and the first file is evicted from disk
+    assert list(cache.memory) == [keys[2]]
+    assert cache.get(keys[0]) is None
+    for index, key in enumerate(keys[1:], start=1):
+        actual_image_labels = cache.get(key)
+        assert actual_image_labels.dtype == np.uint16
+        assert np.array_equal(actual_image_labels, image_labels + index)
+
+
+class CountingLabelImageCache(LabelImageCache):
+    scans = 0
+
+    def scan_disk(self):
+        self.scans += 1
+        return super().scan_disk()
+
+
+def test_label_image_cache_scans_disk_over_limit(tmp_path):
+    """The directory is scanned only when the written files exceed the disk limit"""
+
+    image_labels = np.zeros((3, 4), dtype=np.uint16)
+    cache = CountingLabelImageCache(tmp_path)
+    keys = [cache.build_key("masks", "cam2", index, 0.5, 0.6) for index in range(3)]
+
+    cache.put(keys[0], image_labels)
+    cache.put(keys[0], image_labels)
+    file_size = cache.get_path(keys[0]).stat().st_size
+
+    assert cache.disk_usage == file_size
+    assert cache.scans == 1  # when the cache is created
+
+    cache.disk_size = 2 * file_size
+    cache.put(keys[1], image_labels)
+    cache.put(keys[2], image_labels)
+
+    assert cache.scans == 2
+    assert cache.disk_usage == 2 * file_size
+    assert not cache.get_path(keys[0]).exists()
+
+
+@pytest.mark.parametrize(
+    "init_pcd", [generate_init_pcd(config).voxel_down_sample(voxel_size=1.0)]
+)
+def test_init_map_with_label_image_cache(init_pcd: o3d.geometry.PointCloud, tmp_path):
+    """The instance matrix does not depend on whether the label images are cached"""
+
+    points2instances = InitInstancesMatrixProcessor().process(config, init_pcd)
+
+    cache_config = attr.evolve(config, label_image_cache=LabelImageCache(tmp_path))
+    for _ in range(2):
+        points2instances_cached = InitInstancesMatrixProcessor().process(
+            cache_config, init_pcd
+        )
+        assert np.array_equal(points2instances_cached, points2instances)
+
+    assert len(list(tmp_path.glob("*.npy"))) == points2instances.shape[1]
@@ -99,6 +99,37 @@ def test_voxel_down_sample(
     )
 
 
+@pytest.mark.parametrize(
+    "points2instances, " "voxel_ids, " "expected_points2instances",
+    [
+        (
+            np.array(
+                [
+                    [1, 0],
+                    [0, 1],
+                    [256, 0],
+                    [2, 2],
+                    [1, 0],
+                    [0, 256],
+                    [2, 2],
+                    [0, 1],
+                ]
+            ),
+            np.array([0, 0, 1, 1, 1, 2, 2, 2]),
+            np.array([[0, 1], [256, 0], [0, 256]]),
+        )
+    ],
+)
+def test_find_voxel_instances(points2instances, voxel_ids, expected_points2instances):
+    """The most frequent row of each voxel, equally frequent rows are compared by their bytes"""
+
+    actual_points2instances = VoxelDownProcessor().find_voxel_instances(
+        points2instances, voxel_ids, len(expected_points2instances)
+    )
+
+    assert (actual_points2instances == expected_points2instances).all()
+
+
 def check_result_points(actual_pcd, expected_points):
     actual_points = np.asarray(actual_pcd.points)
 
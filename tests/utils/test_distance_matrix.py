@@ -15,8 +15,12 @@
 import numpy as np
 import pytest
 
-from src.utils.distances_utils import dfs
+from scipy import sparse
+from scipy.spatial.distance import cdist
+
+from src.utils.distances_utils import count_views_by_pairs
 from src.utils.distances_utils import sam_label_distance
+from src.utils.distances_utils import sam_label_distance_sparse
 
 
 @pytest.mark.parametrize(
@@ -101,49 +105,61 @@ def test_label_distance_calculation(
 
 
 @pytest.mark.parametrize(
-    "distance_matrix",
+    "sam_features, " "points",
     [
-        np.array(
-            [
-                [1.0, 0.2, 0.3, 0.0, 0.0, 0.0, 0.0, 0.0],
-                [0.2, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
-                [0.3, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0],
-                [0.0, 0.0, 0.0, 1.0, 0.5, 0.6, 0.0, 0.0],
-                [0.0, 0.0, 0.0, 0.5, 1.0, 0.0, 0.7, 0.0],
-                [0.0, 0.0, 0.0, 0.6, 0.0, 1.0, 0.0, 0.0],
-                [0.0, 0.0, 0.0, 0.0, 0.7, 0.0, 1.0, 0.8],
-                [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.8, 1.0],
-            ]
-        ),
+        (
+            np.array(
+                [
+                    [1, 2, 3, 4],
+                    [1, 2, 5, 6],
+                    [1, 2, 3, 4],
+                    [0, 17, 13, 29],
+                    [1, 0, 5, 4],
+                ]
+            ),
+            np.array(
+                [
+                    [0.1, 0.2, 0.3],
+                    [0.5, 1.1, 0.3],
+                    [1.6, 0.2, 0.4],
+                    [43.76, 0.1, 0.2],
+                    [0.3, 0.3, 2.1],
+                ]
+            ),
+        )
     ],
 )
-def test_dfs(distance_matrix):
-    actual_visited_vertices_1 = dfs(distance_matrix, start_vertex=1)
-    expected_visited_vertices_1 = np.array(
-        [
-            True,
-            True,
-            True,
-            False,
-            False,
-            False,
-            False,
-            False,
-        ]
+def test_sparse_label_distance_calculation(sam_features, points):
+    """The sparse distance matrix coincides with the dense one"""
+
+    expected_label_distance, expected_mask = sam_label_distance(
+        sam_features, cdist(points, points), 3, 5, 5
     )
+    actual_label_distance, actual_mask = sam_label_distance_sparse(
+        sam_features, points, 3, 5, 5
+    )
+
+    assert sparse.issparse(actual_label_distance)
+    assert np.allclose(actual_label_distance.toarray(), expected_label_distance)
+    assert (actual_mask.toarray() == expected_mask).all()
+
 
-    actual_visited_vertices_7 = dfs(distance_matrix, start_vertex=7)
-    expected_visited_vertices_7 = np.array(
+@pytest.mark.parametrize("chunk_size", [1, 2, 1000])
+def test_count_views_by_pairs(chunk_size):
+    sam_features = np.array(
         [
-            False,
-            False,
-            False,
-            True,
-            True,
-            True,
-            True,
-            True,
+            [1, 2, 3, 4],
+            [1, 2, 5, 6],
+            [1, 2, 3, 4],
+            [0, 17, 13, 29],
         ]
     )
-    assert (actual_visited_vertices_1 == expected_visited_vertices_1).all()
-    assert (actual_visited_vertices_7 == expected_visited_vertices_7).all()
+    point1 = np.array([0, 0, 1, 3])
+    point2 = np.array([1, 2, 3, 0])
+
+    view_counter, different_views = count_views_by_pairs(
+        sam_features, point1, point2, chunk_size
+    )
+
+    assert (view_counter == np.array([4, 4, 3, 3])).all()
+    assert (different_views == np.array([2, 0, 3, 3])).all()
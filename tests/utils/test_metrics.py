@@ -0,0 +1,107 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from src.utils.metrics_utils import build_cluster_array
+from src.utils.metrics_utils import build_pred_inst_array
+from src.utils.metrics_utils import calculate_clusters_in_gt_instance
+from src.utils.metrics_utils import calculate_iou_table
+from src.utils.metrics_utils import calculate_metrics_by_thresholds
+from src.utils.trace import Trace
+
+inst_label_array = np.array([0, 0, 3, 0, 3, 0, 5, 5, 0, 0])
+trace = Trace.from_int_vectors([[0, 1], [2, 3], [4], [5], [6, 7], [8, 9]])
+
+
+@pytest.mark.parametrize(
+    "clusters, expected_clusters_in_gt_instance",
+    [
+        ([np.array([0, 1, 2]), np.array([3, 4, 5])], [200 / 3, 100 / 3]),
+        (Trace.from_int_vectors([[4], [0, 5], [1, 2, 3]]), [100.0, 0.0, 200 / 3]),
+    ],
+)
+def test_calculate_clusters_in_gt_instance(clusters, expected_clusters_in_gt_instance):
+    actual = calculate_clusters_in_gt_instance(inst_label_array, clusters, trace)
+
+    assert np.allclose(actual, expected_clusters_in_gt_instance)
+
+
+@pytest.mark.parametrize(
+    "instance_threshold, expected_pred_inst_array",
+    [
+        (0, [1, 1, 1, 1, 3, 4, 2, 2, 3, 3]),
+        (50, [1, 1, 1, 1, 3, 0, 2, 2, 3, 3]),
+        (100, [0, 0, 0, 0, 0, 0, 1, 1, 0, 0]),
+    ],
+)
+def test_build_pred_inst_array(instance_threshold, expected_pred_inst_array):
+    clusters = [np.array([0, 1]), np.array([4]), np.array([2, 5]), np.array([3])]
+
+    actual = build_pred_inst_array(
+        inst_label_array, clusters, trace, instance_threshold
+    )
+
+    assert actual.tolist() == expected_pred_inst_array
+
+
+def test_calculate_iou_table():
+    pred_labels = np.array([1, 1, 1, 0, 2, 2, 3])
+    gt_labels = np.array([4, 4, 4, 4, 0, 7, 7])
+
+    actual_pred, actual_gt, actual_iou = calculate_iou_table(pred_labels, gt_labels)
+
+    assert actual_pred.tolist() == [1, 2, 3]
+    assert actual_gt.tolist() == [4, 7, 7]
+    assert np.allclose(actual_iou, [3 / 4, 1 / 3, 1 / 2])
+
+
+@pytest.mark.parametrize(
+    "gt_labels, expected_metrics",
+    [
+        (
+            np.array([3, 3, 3, 0, 0, 0, 5, 5, 0, 0]),
+            {
+                # only the first cluster matches an instance (IoU 3/4)
+                "precision": [1 / 4, 1 / 2, 1.0],
+                "recall": [1 / 2, 1 / 2, 1 / 2],
+                "fScore": [1 / 3, 1 / 2, 2 / 3],
+                "gt_instances": [2, 2, 2],
+                "pred_instances": [4, 2, 1],
+            },
+        ),
+        (
+            np.zeros(10, dtype=int),
+            {
+                "precision": [0.0, 0.0, 0.0],
+                "recall": [0.0, 0.0, 0.0],
+                "fScore": [0.0, 0.0, 0.0],
+                "gt_instances": [0, 0, 0],
+                "pred_instances": [4, 0, 0],
+            },
+        ),
+    ],
+)
+def test_calculate_metrics_by_thresholds(gt_labels, expected_metrics):
+    clusters = [np.array([0, 1]), np.array([4, 5]), np.array([2]), np.array([3])]
+
+    actual_metrics = calculate_metrics_by_thresholds(
+        gt_labels, clusters, trace, [0, 50, 100]
+    )
+
+    cluster_array = build_cluster_array(clusters, trace, len(gt_labels))
+    assert cluster_array.tolist() == [1, 1, 1, 1, 3, 4, 2, 2, 2, 2]
+    for name, expected in expected_metrics.items():
+        assert np.allclose(actual_metrics[name], expected)
@@ -0,0 +1,76 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import numpy as np
+import pytest
+
+from src.utils.result_utils import is_valid_result
+from src.utils.result_utils import load_result_array
+from src.utils.result_utils import load_result_meta
+from src.utils.result_utils import load_result_trace
+from src.utils.result_utils import save_result
+from src.utils.trace import Trace
+
+
+def test_result_roundtrip(tmp_path):
+    points = np.arange(12, dtype=float).reshape(4, 3)
+    labels = np.array([0, 3, 3, 1])
+    trace = Trace.from_int_vectors([[0, 5], [1], [2, 3, 4], [6]])
+    clusters = [np.array([0, 2]), np.array([1]), np.array([3])]
+
+    save_result(
+        tmp_path.joinpath("result"),
+        arrays={"points": points, "labels": labels},
+        traces={"trace": trace, "clusters": clusters},
+        attributes={"config": {"T_normalized_cut": 0.02}},
+    )
+
+    path = tmp_path.joinpath("result")
+    assert is_valid_result(path)
+    assert load_result_meta(path)["attributes"] == {
+        "config": {"T_normalized_cut": 0.02}
+    }
+
+    actual_points = load_result_array(path, "points")
+    assert isinstance(actual_points, np.memmap)
+    assert np.array_equal(actual_points, points)
+    assert np.array_equal(load_result_array(path, "labels", mmap_mode=None), labels)
+    assert load_result_trace(path, "trace") == trace
+    actual_clusters = load_result_trace(path, "clusters")
+    assert [cluster.tolist() for cluster in actual_clusters] == [
+        cluster.tolist() for cluster in clusters
+    ]
+
+
+@pytest.mark.parametrize(
+    "break_result",
+    [
+        lambda path: path.joinpath("meta.json").unlink(),
+        lambda path: path.joinpath("trace.indices.npy").unlink(),
+        lambda path: path.joinpath("meta.json").write_text(json.dumps({"version": 1})),
+        lambda path: path.joinpath("meta.json").write_text("{"),
+    ],
+)
+def test_invalid_result(break_result, tmp_path):
+    save_result(
+        tmp_path,
+        arrays={"labels": np.zeros(3, dtype=int)},
+        traces={"trace": Trace.from_int_vectors([[0], [1, 2]])},
+    )
+    assert is_valid_result(tmp_path)
+
+    break_result(tmp_path)
+
+    assert not is_valid_result(tmp_path)
@@ -15,8 +15,11 @@
 import numpy as np
 import pytest
 
+from src.utils.sam_mask_utils import compact_to_masks
+from src.utils.sam_mask_utils import find_intersection_area
 from src.utils.sam_mask_utils import find_intersection_mask
 from src.utils.sam_mask_utils import find_union_mask
+from src.utils.sam_mask_utils import masks_to_compact
 
 
 @pytest.mark.parametrize(
@@ -110,6 +113,71 @@ def test_find_intersection_mask_none_result(
     assert actual_intersection_mask == None
 
 
+@pytest.mark.parametrize(
+    "mask1, " "mask2, " "expected_area, " "expected_bbox",
+    [
+        (
+            {
+                "segmentation": np.array(
+                    [
+                        [False, False, True, False, False],
+                        [False, False, True, True, False],
+                        [True, False, True, False, False],
+                    ]
+                ),
+                "bbox": [0, 0, 3, 2],
+                "area": 5,
+            },
+            {
+                "segmentation": np.array(
+                    [
+                        [False, False, False, False, False],
+                        [False, False, True, True, True],
+                        [False, False, False, False, False],
+                    ]
+                ),
+                "bbox": [2, 1, 2, 0],
+                "area": 3,
+            },
+            2,
+            [2, 1, 1, 0],
+        ),
+        (
+            {
+                "segmentation": np.array(
+                    [
+                        [True, True, False, False, False],
+                        [True, True, False, False, False],
+                        [False, False, False, False, False],
+                    ]
+                ),
+                "bbox": [0, 0, 1, 1],
+                "area": 4,
+            },
+            {
+                "segmentation": np.array(
+                    [
+                        [False, False, False, False, False],
+                        [False, False, False, False, False],
+                        [False, False, False, True, True],
+                    ]
+                ),
+                "bbox": [3, 2, 1, 0],
+                "area": 2,
+            },
+            None,
+            None,
+        ),
+    ],
+)
+def test_find_intersection_area(mask1, mask2, expected_area, expected_bbox):
+    """The intersection is counted on the crop of the boxes including their borders"""
+
+    actual_area, actual_bbox = find_intersection_area(mask1, mask2)
+    assert actual_area == expected_area
+    assert actual_bbox == expected_bbox
+
+
 @pytest.mark.parametrize(
     "mask1, " "mask2, " "expected_union_mask",
     [
@@ -161,3 +229,75 @@ def test_find_union_mask(
     ).all()
     assert actual_union_mask["bbox"] == expected_union_mask["bbox"]
     assert actual_union_mask["area"] == expected_union_mask["area"]
+
+
+@pytest.mark.parametrize(
+    "masks",
+    [
+        [
+            {
+                "segmentation": np.array(
+                    [
+                        [False, False, True, False, False],
+                        [False, False, True, True, False],
+                        [True, False, True, False, False],
+                    ]
+                ),
+                "bbox": [0, 0, 4, 3],
+                "area": 5,
+                "predicted_iou": 0.9,
+                "point_coords": [[2.5, 1.0]],
+                "crop_box": [0, 0, 5, 3],
+            },
+            {
+                "segmentation": np.array(
+                    [
+                        [False, False, False, False, False],
+                        [False, False, False, True, True],
+                        [False, False, False, False, False],
+                    ]
+                ),
+                "bbox": [3, 1, 1, 0],
+                "area": 2,
+                "predicted_iou": 0.8,
+                "point_coords": [[3.0, 1.0]],
+                "crop_box": [0, 0, 5, 3],
+            },
+            {
+                "segmentation": np.zeros((3, 5), dtype=bool),
+                "bbox": [0, 0, 0, 0],
+                "area": 0,
+                "predicted_iou": 0.1,
+                "point_coords": [[0.0, 0.0]],
+                "crop_box": [1, 0, 4, 3],
+            },
+        ],
+    ],
+)
+def test_compact_masks(masks):
+    """Masks are restored from the compact format without changes"""
+
+    compact = masks_to_compact(masks)
+    actual_masks = compact_to_masks(compact)
+
+    assert all(isinstance(value, np.ndarray) for value in compact.values())
+    assert len(actual_masks) == len(masks)
+    for actual_mask, mask in zip(actual_masks, masks):
+        assert actual_mask.keys() == mask.keys()
+        assert (actual_mask["segmentation"] == mask["segmentation"]).all()
+        assert actual_mask["bbox"] == mask["bbox"]
+        assert actual_mask["area"] == mask["area"]
+        assert actual_mask["predicted_iou"] == mask["predicted_iou"]
+        assert actual_mask["point_coords"] == mask["point_coords"]
+        assert actual_mask["crop_box"] == mask["crop_box"]
+
+
+def test_compact_masks_without_masks():
+    """The shape of an image without masks is stored in the compact format"""
+
+    compact = masks_to_compact([], image_shape=(3, 5))
+
+    assert compact["image_shape"].tolist() == [3, 5]
+    assert compact_to_masks(compact) == []
+    with pytest.raises(ValueError):
+        masks_to_compact([])
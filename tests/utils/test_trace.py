@@ -0,0 +1,61 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import numpy as np
+import open3d as o3d
+import pytest
+
+from src.utils.trace import Trace
+
+
+@pytest.mark.parametrize(
+    "int_vectors, " "selection, " "expected_lists",
+    [
+        (
+            [
+                o3d.utility.IntVector([1000, 7891, 452]),
+                o3d.utility.IntVector([33]),
+                o3d.utility.IntVector([224, 4565]),
+                o3d.utility.IntVector([]),
+                o3d.utility.IntVector([5, 6, 7, 8]),
+            ],
+            np.array([True, False, True, True, True]),
+            [[1000, 7891, 452], [224, 4565], [], [5, 6, 7, 8]],
+        ),
+        (
+            [[1, 2], [3], [4, 5, 6]],
+            np.array([2, 0]),
+            [[4, 5, 6], [1, 2]],
+        ),
+    ],
+)
+def test_trace_subset(int_vectors, selection, expected_lists):
+    trace = Trace.from_int_vectors(int_vectors)
+
+    actual_trace = trace.subset(selection)
+
+    assert len(trace) == len(int_vectors)
+    assert [list(indices) for indices in actual_trace] == expected_lists
+    assert actual_trace == Trace.from_int_vectors(expected_lists)
+    assert trace[selection] == actual_trace
+    assert list(trace[-1]) == list(int_vectors[-1])
+
+
+def test_trace_save_load(tmp_path):
+    trace = Trace.from_int_vectors([[4, 1], [], [2, 3, 0]])
+
+    trace.save(tmp_path.joinpath("trace.npz"))
+
+    assert Trace.load(tmp_path.joinpath("trace.npz")) == trace
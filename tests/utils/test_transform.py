@@ -0,0 +1,88 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import open3d as o3d
+import pytest
+
+from src.utils.geometry_utils import transform_points
+from src.utils.pcd_utils import project_points_to_image
+from src.utils.pcd_utils import project_points_to_views
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_transform_points(dtype):
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-50, 50, (100, 3))
+    angle = 0.3
+    T = np.array(
+        [
+            [np.cos(angle), -np.sin(angle), 0.0, 1.5],
+            [np.sin(angle), np.cos(angle), 0.0, -2.0],
+            [0.0, 0.0, 1.0, 0.7],
+            [0.0, 0.0, 0.0, 1.0],
+        ]
+    )
+
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(points)
+    expected_points = np.asarray(pcd.transform(T).points)
+
+    buffer = np.empty((100, 3), dtype=dtype)
+    actual_points = transform_points(points.astype(dtype), T, out=buffer)
+
+    assert actual_points is buffer
+    assert actual_points.dtype == dtype
+    assert np.allclose(actual_points, expected_points, atol=1e-4)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1000])
+@pytest.mark.parametrize("margin", [0, 3])
+def test_project_points_to_views(chunk_size, margin):
+    """Each view is projected as by project_points_to_image of the points in its camera frame"""
+
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-20, 20, (100, 3))
+    cam_intrinsics = np.array(
+        [
+            [[10.0, 0.0, 6.0], [0.0, 10.0, 5.0], [0.0, 0.0, 1.0]],
+            [[5.0, 0.0, 4.0], [0.0, 5.0, 8.0], [0.0, 0.0, 1.0]],
+            [[10.0, 0.0, 10.0], [0.0, 10.0, 2.0], [0.0, 0.0, 1.0]],
+        ]
+    )
+    img_shapes = [(12, 10), (8, 16), (20, 4)]
+
+    T_views = np.stack([np.eye(4)] * 3)
+    for view, angle in enumerate([0.0, 0.4, -1.2]):
+        T_views[view, :3, :3] = [
+            [np.cos(angle), 0.0, np.sin(angle)],
+            [0.0, 1.0, 0.0],
+            [-np.sin(angle), 0.0, np.cos(angle)],
+        ]
+        T_views[view, :3, 3] = [view, -view, 2.0 * view]
+
+    points_cc, pixels, depths, in_frustum = project_points_to_views(
+        points, T_views, cam_intrinsics, img_shapes, margin, chunk_size=chunk_size
+    )
+
+    for view in range(len(T_views)):
+        expected_points_cc = transform_points(points, T_views[view])
+        indices, expected_pixels, expected_depths = project_points_to_image(
+            expected_points_cc, cam_intrinsics[view], img_shapes[view], margin
+        )
+
+        assert np.array_equal(points_cc[view], expected_points_cc)
+        assert np.flatnonzero(in_frustum[view]).tolist() == indices.tolist()
+        assert np.array_equal(pixels[view, indices], expected_pixels)
+        assert np.array_equal(depths[view, indices], expected_depths)
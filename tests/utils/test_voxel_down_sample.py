@@ -0,0 +1,58 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import numpy as np
+import open3d as o3d
+import pytest
+
+from src.utils.pcd_utils import voxel_down_sample_and_trace
+
+
+@pytest.mark.parametrize(
+    "points, " "voxel_size",
+    [
+        (np.random.default_rng(0).uniform(-5.0, 5.0, (2000, 3)), 0.5),
+        (np.random.default_rng(1).normal(100.0, 3.0, (3000, 3)), 0.3),
+    ],
+)
+def test_voxel_down_sample_and_trace(points, voxel_size):
+    """The voxels are the same as the voxels of open3d up to their order"""
+
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(points)
+    expected_pcd, _, expected_trace = pcd.voxel_down_sample_and_trace(
+        voxel_size, pcd.get_min_bound(), pcd.get_max_bound(), True
+    )
+
+    voxel_points, voxel_ids, trace_offsets, trace_indices = voxel_down_sample_and_trace(
+        points, voxel_size
+    )
+
+    assert len(voxel_points) == len(expected_trace)
+    assert np.array_equal(
+        voxel_ids[trace_indices],
+        np.repeat(np.arange(len(voxel_points)), np.diff(trace_offsets)),
+    )
+
+    expected_points = np.asarray(expected_pcd.points)
+    for expected_id, int_vector in enumerate(expected_trace):
+        expected_indices = np.asarray(int_vector)
+        voxel_id = voxel_ids[expected_indices[0]]
+
+        assert np.array_equal(
+            trace_indices[trace_offsets[voxel_id] : trace_offsets[voxel_id + 1]],
+            expected_indices,
+        )
+        assert np.array_equal(voxel_points[voxel_id], expected_points[expected_id])
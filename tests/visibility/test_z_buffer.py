@@ -0,0 +1,64 @@
+# Copyright (c) 2023, Sofia Vivdich and Anastasiia Kornilova
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from src.services.visibility.engines import build_visibility_engine
+from src.services.visibility.z_buffer import ZBufferVisibilityEngine
+from src.utils.pcd_utils import project_points_to_image
+
+points = np.array(
+    [
+        [0.5, 0.5, 1.0],
+        [1.0, 1.0, 2.0],
+        [0.515625, 0.515625, 1.03125],
+        [1.2, 1.0, 2.0],
+        [0.5, 0.5, -1.0],
+        [10.0, 0.5, 1.0],
+    ]
+)
+cam_intrinsics = np.array([[10.0, 0.0, 1.0], [0.0, 10.0, 0.5], [0.0, 0.0, 1.0]])
+
+
+@pytest.mark.parametrize(
+    "scale, " "splat_size, " "depth_tolerance, " "expected_indices",
+    [
+        (1.0, 0, 0.05, [0, 2, 3]),
+        (1.0, 0, 0.0, [0, 3]),
+        (1.0, 1, 0.05, [0, 2]),
+        (0.5, 0, 0.05, [0, 2]),
+    ],
+)
+def test_z_buffer_visible_points(scale, splat_size, depth_tolerance, expected_indices):
+    engine = ZBufferVisibilityEngine(scale, splat_size, depth_tolerance)
+
+    projection = project_points_to_image(
+        points, cam_intrinsics, (12, 10), engine.margin
+    )
+    visible = engine.get_visible_points(points, projection, (12, 10))
+
+    assert sorted(projection[0][visible].tolist()) == expected_indices
+
+
+def test_build_unknown_visibility_engine():
+    with pytest.raises(ValueError):
+        build_visibility_engine("ray_casting")
+
+
+def test_build_z_buffer_visibility_engine():
+    engine = build_visibility_engine("z_buffer", None, 1.0, 2, 0.1)
+
+    assert isinstance(engine, ZBufferVisibilityEngine)
+    assert (engine.scale, engine.splat_size, engine.depth_tolerance) == (1.0, 2, 0.1)